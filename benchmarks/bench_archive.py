@@ -0,0 +1,94 @@
+"""
+History queries over a synthetic task archive: years of days with a few
+tasks per active user, then the cost of reopening the archive and of the
+leaderboard, streak and per-user queries behind /history and !task history.
+
+    python benchmarks/bench_archive.py [--days 1095] [--users 300] [--tasks 3]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from archive import TaskArchive, period_start, top  # noqa: E402
+from task_record import Task, today_ordinal  # noqa: E402
+
+
+def build(directory, days, users, tasks_per_user, seed=1):
+    # Each day about a third of the users show up, and most finish most of their tasks
+    rng = random.Random(seed)
+    names = [f"viewer{i}" for i in range(users)]
+    archive = TaskArchive(directory)
+    first_day = today_ordinal() - days
+    count = 0
+    start = time.perf_counter()
+    for day in range(first_day, first_day + days):
+        tasks = []
+        for user in rng.sample(names, users // 3):
+            for _ in range(rng.randint(1, tasks_per_user)):
+                tasks.append((f"{count:08x}", Task(f"task {count}", user, day, rng.random() < 0.8)))
+                count += 1
+        archive.archive_day(day, tasks)
+    return count, time.perf_counter() - start
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--tasks', type=int, default=3, help="most tasks per user per active day")
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='archive-bench-')
+    try:
+        count, build_seconds = build(directory, args.days, args.users, args.tasks)
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(directory) for name in names)
+
+        start = time.perf_counter()
+        archive = TaskArchive(directory)
+        load_seconds = time.perf_counter() - start
+        # Measured on a second load, since tracing slows it down
+        tracemalloc.start()
+        reloaded = TaskArchive(directory)  # noqa: F841, kept alive until measured
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        today = today_ordinal()
+        queries = [
+            ("week leaderboard", lambda: top(archive.completed_between(period_start('week', today), today - 1), 10)),
+            ("month leaderboard", lambda: top(archive.completed_between(period_start('month', today), today - 1), 10)),
+            ("all-time leaderboard", lambda: top(archive.completed_all_time(), 10)),
+            ("user summary", lambda: archive.user_summary('viewer7')),
+            ("streaks", lambda: archive.streaks('viewer7', today)),
+            ("one day's raw tasks", lambda: archive.read_segment(today - 1)),
+        ]
+
+        print(f"{args.days} days, {args.users} users, {count} archived tasks")
+        print(f"archiving {build_seconds / args.days * 1000:.2f} ms/day, {size / 1e6:.1f} MB on disk "
+              f"({size / count:.1f} bytes/task)")
+        print(f"reopening {load_seconds * 1000:.1f} ms, {memory / 1e6:.1f} MB of rollups in memory")
+        print(f"{'query':<24}{'ms':>9}")
+        for name, query in queries:
+            seconds, _ = timed(query, args.repeat)
+            print(f"{name:<24}{seconds * 1000:>9.3f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-tick cost of rendering the big MM:SS timer: the old concatenating
+create_big_text vs the glyph atlas, uncached and memoized.
+
+    python benchmarks/bench_big_text.py [--rounds 20] [--font block]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from big_text import BLOCK_GLYPHS, FONTS  # noqa: E402
+
+
+def legacy_get_big_digits():
+    # Rebuilt on every call, as the old task_manager.get_big_digits did
+    return [list(BLOCK_GLYPHS[str(d)]) for d in range(10)]
+
+
+def legacy_create_big_text(text):
+    big_digits = legacy_get_big_digits()
+    lines = [""] * 5
+    for char in text:
+        if char.isdigit():
+            digit = big_digits[int(char)]
+            for i, line in enumerate(digit):
+                lines[i] += line + "  "
+        elif char == ":":
+            for i in range(5):
+                if i in (1, 3):
+                    lines[i] += "██  "
+                else:
+                    lines[i] += "    "
+    return "\n".join(lines)
+
+
+def countdown():
+    # One full hour of ticks, as the dashboard would render them
+    return [f"{minutes:02d}:{seconds:02d}" for minutes in range(59, -1, -1) for seconds in range(59, -1, -1)]
+
+
+def measure(render, ticks, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in ticks:
+            render(text)
+    return (time.perf_counter() - start) / (rounds * len(ticks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--font', default='block', choices=sorted(FONTS))
+    args = parser.parse_args()
+
+    font = FONTS[args.font]
+    ticks = countdown()
+    rows = [
+        ("glyph atlas", measure(font.render_uncached, ticks, args.rounds)),
+        # First round fills the cache; the rest are what a long stream sees
+        ("atlas + cache", measure(font.render, ticks, args.rounds)),
+    ]
+    if args.font == 'block':
+        rows.insert(0, ("concatenation", measure(legacy_create_big_text, ticks, args.rounds)))
+
+    print(f"{len(ticks)} ticks x {args.rounds} rounds, font '{args.font}'")
+    print(f"{'renderer':<16}{'us/tick':>10}")
+    for name, seconds in rows:
+        print(f"{name:<16}{seconds * 1e6:>10.2f}")
+    print(f"cache: {font.render.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
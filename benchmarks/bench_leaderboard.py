@@ -0,0 +1,53 @@
+"""
+Leaderboard costs as the number of ranked users grows: one completion
+(both rankings updated), a top-10 read and a rank lookup, against sorting
+all of user_stats for every read as the stats panel used to.
+
+    python benchmarks/bench_leaderboard.py [--users 1000 10000 100000]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from leaderboard import Leaderboard  # noqa: E402
+
+
+def timed(fn, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list)
+
+
+def scan_top(user_stats, k):
+    return heapq.nlargest(k, user_stats.items(), key=lambda item: item[1]['total'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--operations', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'users':>8}{'complete µs':>14}{'top-10 µs':>12}{'rank µs':>10}{'scan top-10 µs':>17}")
+    for users in args.users:
+        names = [f"viewer{i}" for i in range(users)]
+        user_stats = {name: {"daily": rng.randint(0, 10), "total": rng.randint(0, 500)} for name in names}
+        leaderboard = Leaderboard(user_stats)
+        # Chat is skewed: a few regulars complete most tasks
+        picks = [(names[min(int(rng.paretovariate(1.2)) - 1, users - 1)],) for _ in range(args.operations)]
+        complete = timed(leaderboard.completed, picks)
+        top = timed(leaderboard.top, [('total', 10)] * args.operations)
+        rank = timed(leaderboard.rank, [('total', name) for (name,) in picks])
+        scan = timed(scan_top, [(user_stats, 10)] * max(1, args.operations // users))
+        print(f"{users:>8}{complete * 1e6:>14.2f}{top * 1e6:>12.2f}{rank * 1e6:>10.2f}{scan * 1e6:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Cost of the metrics on the chat hot path: one timed histogram observation
+per message, with metrics enabled, disabled (BOT_METRICS=0) and absent.
+
+    python benchmarks/bench_metrics.py [--iterations 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import Registry  # noqa: E402
+
+
+def timed(metric, label):
+    start = time.perf_counter()
+    metric.observe(time.perf_counter() - start, label)
+
+
+def untimed(metric, label):
+    pass
+
+
+def measure(fn, metric, iterations):
+    labels = ['PRIVMSG'] * 9 + ['PING']
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(metric, labels[i % 10])
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    enabled = Registry(True).histogram('bench_seconds', "benchmark", label='command')
+    disabled = Registry(False).histogram('bench_seconds', "benchmark", label='command')
+    baseline = measure(untimed, None, args.iterations)
+    rows = [
+        ("no metrics", baseline),
+        ("disabled", measure(timed, disabled, args.iterations)),
+        ("enabled", measure(timed, enabled, args.iterations)),
+    ]
+
+    print(f"{args.iterations} observations")
+    print(f"{'metrics':<12}{'ns/msg':>10}{'overhead':>10}")
+    for name, seconds in rows:
+        print(f"{name:<12}{seconds * 1e9:>10.0f}{(seconds - baseline) * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Startup time of the bot, phase by phase, from process launch to joined
+channel, against the local fake IRC server. Each round is a fresh
+interpreter.
+
+    python benchmarks/bench_startup.py [--rounds 5] [--engine thread|async] [--audio] [--json out.json]
+
+The phases after "connect + join" are the work startup no longer does:
+they show what the first sound and the first dashboard frame cost when
+they are eventually needed.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+# Only what the measured child needs is imported up here, so it doesn't skew the phases
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+
+def child(engine):
+    # Runs in the measured interpreter; prints one JSON line of (phase, seconds)
+    launched = time.time()
+    phases = []
+    last = time.perf_counter()
+
+    def mark(name):
+        nonlocal last
+        now = time.perf_counter()
+        phases.append((name, now - last))
+        last = now
+
+    import dotenv  # noqa: F401
+    mark("import dotenv")
+    import flask  # noqa: F401
+    mark("import flask")
+    import bot as bot_module
+    mark("import bot")
+    if engine == 'async':
+        from async_bot import AsyncTwitchBot
+        mark("import async_bot")
+        bot = AsyncTwitchBot(http_port=int(os.environ['HTTP_PORT']))
+    else:
+        bot = bot_module.TwitchBot()
+    bot_module.bot = bot
+    mark("TwitchBot()")
+    threading.Thread(target=bot.run, daemon=True).start()
+    bot.connection.ready.wait(30)
+    mark("connect + join")
+
+    task_manager = bot.default_channel.task_manager
+    deferred = {'pygame': 'pygame' in sys.modules, 'rich': 'rich' in sys.modules}
+    if task_manager.sound_sink.name == 'host':
+        # The bot's warm-up decodes the sounds on the audio worker; wait for it to finish
+        import audio
+        while not audio.host_sink.sounds and not audio.host_sink.unavailable:
+            time.sleep(0.001)
+        audio.shared_worker.queue.join()
+        mark("sound preload (deferred)")
+    from rich.console import Console
+    from dashboard import Dashboard
+    dashboard = Dashboard(task_manager, Console(file=open(os.devnull, 'w')))
+    dashboard.update()
+    mark("first dashboard frame (deferred)")
+    print(json.dumps({'launched': launched, 'phases': phases, 'loaded_before_join': deferred}), flush=True)
+
+
+def run_round(server_port, workdir, engine, audio, http_port):
+    import subprocess
+    env = dict(os.environ,
+               TWITCH_IRC_HOST='127.0.0.1', TWITCH_IRC_PORT=str(server_port), TWITCH_CHANNEL='startup',
+               TWITCH_BOT_USERNAME='startupbot', TWITCH_OAUTH_TOKEN='oauth:bench', ADMIN_USER='benchadmin',
+               HTTP_PORT=str(http_port), BOT_HEADLESS='1', BOT_AUDIO='host' if audio else 'none',
+               SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    started = time.time()
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', engine], env=env, cwd=workdir,
+                            capture_output=True, text=True, timeout=60).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return [("interpreter start", result['launched'] - started)] + result['phases'], result['loaded_before_join']
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+        return
+
+    import argparse
+    import asyncio
+    import statistics
+    import tempfile
+    from fake_irc import FakeIRCServer
+    from shard_throughput import write_silent_sound
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--engine', choices=('thread', 'async'), default='thread')
+    parser.add_argument('--audio', action='store_true', help="time loading the sounds too (BOT_AUDIO=host)")
+    parser.add_argument('--http-port', type=int, default=18400)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = asyncio.run_coroutine_threadsafe(FakeIRCServer().start(), loop).result()
+
+    rounds = []
+    for _ in range(args.rounds):
+        workdir = tempfile.mkdtemp(prefix='startup-bench-')
+        write_silent_sound(workdir)
+        phases, loaded = run_round(server.port, workdir, args.engine, args.audio, args.http_port)
+        rounds.append(phases)
+
+    names = [name for name, _ in rounds[0]]
+    medians = {name: statistics.median(phases[i][1] for phases in rounds) for i, name in enumerate(names)}
+    join_index = names.index("connect + join")
+    to_join = sum(medians[name] for name in names[:join_index + 1])
+
+    print(f"{args.engine} engine, median of {args.rounds} launches")
+    print(f"{'phase':<34}{'ms':>9}")
+    for name in names:
+        print(f"{name:<34}{medians[name] * 1000:>9.1f}")
+    print(f"{'launch to joined':<34}{to_join * 1000:>9.1f}")
+    print(f"loaded before joining: {', '.join(name for name, done in loaded.items() if done) or 'neither pygame nor rich'}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'engine': args.engine, 'rounds': args.rounds,
+                       'phases_ms': {name: round(value * 1000, 2) for name, value in medians.items()},
+                       'launch_to_joined_ms': round(to_join * 1000, 2),
+                       'loaded_before_join': loaded}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
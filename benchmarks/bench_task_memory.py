@@ -0,0 +1,82 @@
+"""
+Per-task memory footprint: the old dict-per-task layout vs slotted Task records.
+
+    python benchmarks/bench_task_memory.py [--tasks 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from task_record import Task, today_ordinal  # noqa: E402
+
+
+def make_usernames(count):
+    # Usernames arrive as fresh strings parsed out of each IRC line
+    return [f"viewer_{i % 500}".encode().decode() for i in range(count)]
+
+
+def build_dict_tasks(count):
+    users = make_usernames(count)
+    return {
+        f"{i:08x}": {
+            "description": f"task number {i}",
+            "completed": False,
+            "user": users[i],
+            "date": date.today(),
+        }
+        for i in range(count)
+    }
+
+
+def build_slotted_tasks(count):
+    users = make_usernames(count)
+    return {
+        f"{i:08x}": Task(f"task number {i}", users[i], today_ordinal())
+        for i in range(count)
+    }
+
+
+def save_dicts(tasks):
+    return {task_id: {**task, 'date': task['date'].isoformat()} for task_id, task in tasks.items()}
+
+
+def save_slotted(tasks):
+    return {task_id: task.to_json() for task_id, task in tasks.items()}
+
+
+def measure(build, save, count):
+    gc.collect()
+    tracemalloc.start()
+    tasks = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    save(tasks)
+    save_seconds = time.perf_counter() - start
+    return current, save_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = [
+        ("dict per task", *measure(build_dict_tasks, save_dicts, args.tasks)),
+        ("slotted Task", *measure(build_slotted_tasks, save_slotted, args.tasks)),
+    ]
+    print(f"{args.tasks} tasks (includes task IDs, descriptions and the tasks dict itself)")
+    print(f"{'layout':<16}{'total MiB':>12}{'bytes/task':>12}{'serialize ms':>14}")
+    for name, total, save_seconds in rows:
+        print(f"{name:<16}{total / 2**20:>12.1f}{total / args.tasks:>12.0f}{save_seconds * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
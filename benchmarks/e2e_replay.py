@@ -0,0 +1,379 @@
+"""
+End-to-end chat replay: drives a real bot (threaded or asyncio) through the
+local fake IRC server and reports throughput, command-to-reply latency,
+save_data cost and memory growth.
+
+    python benchmarks/e2e_replay.py [--engine thread|async] [--rate 2000] [--duration 20]
+                                    [--chat recorded.log] [--json results.json]
+
+Synthetic chat mixes ordinary lines with !task add/list/complete, plus
+periodic command bursts, raids of non-command chat, server PINGs and
+lines split across TCP writes. --chat replays raw IRC lines recorded
+from Twitch instead (PRIVMSG lines are retargeted to the bench channel).
+
+By default the outbound rate limit and the per-viewer throttle are lifted,
+so latency measures the bot rather than Twitch's limits; --twitch-limits
+keeps them (throttled commands then show up as unanswered).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fake_irc import FakeIRCServer  # noqa: E402
+from irc import parse_line  # noqa: E402
+from send_queue import COALESCE_SEPARATOR  # noqa: E402
+from shard_throughput import TAGS, TEXTS, write_silent_sound  # noqa: E402
+
+CHANNEL = 'benchroom'
+BOT_NICK = 'benchbot'
+SENTINEL = 'zz_sentinel'
+TICK = 0.01  # the driver sends whatever is due every 10 ms
+TASK_WORDS = ["read chapter", "write tests", "fix the parser", "answer email", "draft slides", "review PR"]
+
+
+def rss_mb():
+    # Current resident set size; falls back to the peak where /proc is missing
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        scale = 2 ** 20 if sys.platform == 'darwin' else 2 ** 10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+
+class ReplyTracker:
+    """
+    Matches the bot's '@user ...' replies to the commands that caused them.
+    Replies to one user come back in order, so each user has a FIFO of send
+    times. Runs on the fake server's loop thread, as lines arrive.
+    """
+
+    def __init__(self):
+        self.pending = defaultdict(deque)
+        self.latencies = []
+        self.open_tasks = defaultdict(list)  # user -> task IDs learned from "Task added" replies
+        self.lock = threading.Lock()
+        self.last_reply_at = None
+
+    def sent(self, user, at):
+        with self.lock:
+            self.pending[user].append(at)
+
+    def on_line(self, line):
+        now = time.perf_counter()
+        message = parse_line(line)
+        if message is None or message.command != 'PRIVMSG':
+            return
+        with self.lock:
+            for part in message.trailing.split(COALESCE_SEPARATOR):
+                if not part.startswith('@'):
+                    continue
+                user, _, text = part[1:].partition(' ')
+                if text.startswith("Task added with ID: "):
+                    self.open_tasks[user].append(text.rsplit(' ', 1)[1])
+                queue = self.pending.get(user)
+                if queue:
+                    self.latencies.append(now - queue.popleft())
+                    self.last_reply_at = now
+
+    def take_task(self, user):
+        with self.lock:
+            tasks = self.open_tasks.get(user)
+            return tasks.pop() if tasks else None
+
+    def unanswered(self):
+        with self.lock:
+            return sum(len(queue) for queue in self.pending.values())
+
+
+class SyntheticChat:
+    """
+    Yields (kind, user, line) actions: 'chat' lines (some of them commands),
+    'ping' from the server and 'split' lines sent in two writes.
+    """
+
+    def __init__(self, tracker, users, command_share, burst_size, burst_every, raid_size, raid_every,
+                 split_share, seed):
+        self.tracker = tracker
+        self.users = [f"viewer{n}" for n in range(users)]
+        self.command_share = command_share
+        self.burst_size = burst_size
+        self.burst_every = burst_every
+        self.raid_size = raid_size
+        self.raid_every = raid_every
+        self.split_share = split_share
+        self.random = random.Random(seed)
+        self.count = 0
+
+    def command(self, user):
+        roll = self.random.random()
+        if roll < 0.4:
+            task_id = self.tracker.take_task(user)
+            if task_id:
+                return f"!task complete {task_id}"
+        if roll < 0.55:
+            return "!task list"
+        return f"!task add {self.random.choice(TASK_WORDS)} #{self.count}"
+
+    def line(self, user, text):
+        self.count += 1
+        return f"@{TAGS.format(user=user, n=self.count)} :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{CHANNEL} :{text}"
+
+    def chat(self, user, text):
+        kind = 'split' if self.random.random() < self.split_share else 'chat'
+        return kind, user if text.startswith('!task') else None, self.line(user, text)
+
+    def steady(self, count):
+        for _ in range(count):
+            user = self.random.choice(self.users)
+            if self.random.random() < self.command_share:
+                yield self.chat(user, self.command(user))
+            else:
+                yield self.chat(user, self.random.choice(TEXTS))
+
+    def burst(self):
+        # Everyone adds, lists or completes at once, e.g. right after a focus block ends
+        for user in self.random.sample(self.users, min(self.burst_size, len(self.users))):
+            yield self.chat(user, self.command(user))
+
+    def raid(self):
+        for n in range(self.raid_size):
+            user = f"raider{n}"
+            yield self.chat(user, self.random.choice(("hype", "raid hype!", "hello from the raid", "<3")))
+
+    def second(self, index, rate):
+        # One second of chat: the steady mix, a PING, and bursts and raids on schedule
+        actions = list(self.steady(rate))
+        actions.append(('ping', None, None))
+        if self.burst_every and index % self.burst_every == self.burst_every - 1:
+            actions.extend(self.burst())
+        if self.raid_every and index % self.raid_every == self.raid_every // 2:
+            actions.extend(self.raid())
+        return actions
+
+
+class RecordedChat:
+    # Raw IRC lines captured from Twitch, replayed in order into the bench channel
+
+    def __init__(self, path):
+        self.lines = []
+        with open(path, encoding='utf-8') as f:
+            for raw in f:
+                message = parse_line(raw.rstrip('\r\n'))
+                if message is None or message.command != 'PRIVMSG':
+                    continue
+                user, text = message.nick, message.trailing
+                tags = raw.split(' ', 1)[0] if raw.startswith('@') else ''
+                line = f"{tags + ' ' if tags else ''}:{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{CHANNEL} :{text}"
+                self.lines.append(('chat', user if text.startswith('!task') else None, line))
+        self.position = 0
+
+    def second(self, index, rate):
+        actions = self.lines[self.position:self.position + rate]
+        self.position += len(actions)
+        return actions
+
+    def done(self):
+        return self.position >= len(self.lines)
+
+
+def deliver(server, actions, tracker):
+    # Runs on the server loop: one write for plain lines, separate writes for split ones
+    now = time.perf_counter()
+    batch = []
+    for kind, user, line in actions:
+        if user is not None:
+            tracker.sent(user, now)
+        if kind == 'chat':
+            batch.append(line + "\r\n")
+            continue
+        if batch:
+            server.send_raw("".join(batch).encode('utf-8'))
+            batch = []
+        if kind == 'ping':
+            server.send_ping()
+        else:
+            server.send_split(line, len(line) // 2)
+    if batch:
+        server.send_raw("".join(batch).encode('utf-8'))
+
+
+def start_bot(engine, http_port):
+    import bot as bot_module
+    if engine == 'async':
+        from async_bot import AsyncTwitchBot
+        bot = AsyncTwitchBot(http_port=http_port, dashboard=False)
+    else:
+        bot = bot_module.TwitchBot()
+    bot_module.bot = bot
+    threading.Thread(target=bot.run, daemon=True).start()
+    return bot
+
+
+def measure_save_data(task_manager, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        task_manager.save_data()
+        timings.append(time.perf_counter() - start)
+    size = os.path.getsize(task_manager.file_path) if os.path.exists(task_manager.file_path) else None
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--engine', choices=('thread', 'async'), default='thread')
+    parser.add_argument('--storage', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--rate', type=int, default=2000, help="steady chat lines per second")
+    parser.add_argument('--duration', type=int, default=20, help="seconds of chat to send")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--command-share', type=float, default=0.1)
+    parser.add_argument('--burst-size', type=int, default=200)
+    parser.add_argument('--burst-every', type=int, default=5, help="seconds between command bursts (0: none)")
+    parser.add_argument('--raid-size', type=int, default=1000)
+    parser.add_argument('--raid-every', type=int, default=10, help="seconds between raids (0: none)")
+    parser.add_argument('--split-share', type=float, default=0.01)
+    parser.add_argument('--chat', help="replay this file of raw IRC lines instead of synthetic chat")
+    parser.add_argument('--twitch-limits', action='store_true')
+    parser.add_argument('--save-rounds', type=int, default=5)
+    parser.add_argument('--http-port', type=int, default=18300)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    # The bot runs in a scratch directory; resolve the user's paths first
+    json_path = os.path.abspath(args.json) if args.json else None
+    chat_path = os.path.abspath(args.chat) if args.chat else None
+    workdir = tempfile.mkdtemp(prefix='e2e-replay-')
+    write_silent_sound(workdir)
+    os.chdir(workdir)
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = asyncio.run_coroutine_threadsafe(FakeIRCServer().start(), loop).result()
+    tracker = ReplyTracker()
+    server.on_line = tracker.on_line
+
+    os.environ.update(
+        TWITCH_IRC_HOST='127.0.0.1', TWITCH_IRC_PORT=str(server.port), TWITCH_CHANNEL=CHANNEL,
+        TWITCH_BOT_USERNAME=BOT_NICK, TWITCH_OAUTH_TOKEN='oauth:bench', ADMIN_USER='benchadmin',
+        CHANNEL_DATA_DIR=os.path.join(workdir, 'channels'), TASK_STORAGE=args.storage,
+        BOT_HEADLESS='1', SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1',
+    )
+    started = time.perf_counter()
+    bot = start_bot(args.engine, args.http_port)
+    if not bot.connection.ready.wait(args.timeout):
+        raise SystemExit("bot never joined the bench channel")
+    startup_seconds = time.perf_counter() - started
+    if not args.twitch_limits:
+        bot.send_queue.bucket.set_limit(10 ** 9, 1)
+        bot.commands.throttle = None
+    task_manager = bot.default_channel.task_manager
+    rss_start = rss_mb()
+
+    if args.chat:
+        chat = RecordedChat(chat_path)
+        seconds = range(10 ** 9)
+    else:
+        chat = SyntheticChat(tracker, args.users, args.command_share, args.burst_size, args.burst_every,
+                             args.raid_size, args.raid_every, args.split_share, args.seed)
+        seconds = range(args.duration)
+
+    sent = commands = 0
+    start = time.perf_counter()
+    for index in seconds:
+        if args.chat and chat.done():
+            break
+        actions = chat.second(index, args.rate)
+        sent += sum(1 for kind, _, _ in actions if kind != 'ping')
+        commands += sum(1 for _, user, _ in actions if user is not None)
+        # Spread the second's lines over its ticks
+        ticks = int(1 / TICK)
+        per_tick = -(-len(actions) // ticks)
+        second_start = start + index
+        for tick in range(ticks):
+            chunk = actions[tick * per_tick:(tick + 1) * per_tick]
+            if chunk:
+                loop.call_soon_threadsafe(deliver, server, chunk, tracker)
+            delay = second_start + (tick + 1) * TICK - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    # Chat is handled in order, so once the sentinel's reply is back every line before it was too
+    tracker.sent(SENTINEL, time.perf_counter())
+    sentinel = f":{SENTINEL}!{SENTINEL}@{SENTINEL}.tmi.twitch.tv PRIVMSG #{CHANNEL} :!task list"
+    loop.call_soon_threadsafe(deliver, server, [('chat', None, sentinel)], tracker)
+    deadline = time.monotonic() + args.timeout
+    while tracker.pending.get(SENTINEL):
+        if time.monotonic() > deadline:
+            raise SystemExit("the bot never caught up with the replay")
+        time.sleep(0.01)
+    elapsed = tracker.last_reply_at - start
+    rss_end = rss_mb()
+
+    latencies = sorted(tracker.latencies)
+    result = {
+        "engine": args.engine,
+        "storage": args.storage,
+        "source": args.chat or "synthetic",
+        "twitch_limits": args.twitch_limits,
+        "offered_rate": args.rate,
+        "messages": sent,
+        "commands": commands,
+        "replies": len(latencies),
+        "unanswered": tracker.unanswered(),
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(sent / elapsed),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "p99": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            "max": round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+        "save_data": measure_save_data(task_manager, args.save_rounds),
+        "tasks": len(task_manager.tasks),
+        "rss_mb": {"start": round(rss_start, 1), "end": round(rss_end, 1), "growth": round(rss_end - rss_start, 1)},
+        "startup_seconds": round(startup_seconds, 3),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+    print(f"{result['engine']} engine, {result['storage']} storage, {result['source']} chat")
+    print(f"{sent} lines ({commands} commands) in {elapsed:.2f}s: {result['messages_per_second']} msg/s")
+    print(f"command-to-reply latency: p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms, "
+          f"max {result['latency_ms']['max']} ms; {result['unanswered']} unanswered")
+    print(f"save_data: {result['save_data']['mean_ms']} ms mean, {result['save_data']['max_ms']} ms max, "
+          f"{result['save_data']['bytes']} bytes for {result['tasks']} tasks")
+    print(f"RSS: {result['rss_mb']['start']} -> {result['rss_mb']['end']} MB")
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Load test for the overlay HTTP server: hammers one endpoint from several
+keep-alive client threads and reports requests per second and latency.
+
+Start the bot (or any server exposing the overlay app) first, then:
+
+    python benchmarks/load_status.py --url http://localhost:5000/status --clients 16 --duration 10
+
+--revalidate sends If-None-Match with the last ETag, like a polling browser.
+--self-host starts the pooled server on a bot stub in-process, for a quick
+measurement without Twitch credentials.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def client(url, deadline, revalidate, latencies, errors):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    path = parts.path or '/'
+    etag = None
+    while time.perf_counter() < deadline:
+        headers = {'If-None-Match': etag} if revalidate and etag else {}
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+        etag = response.getheader('ETag') or etag
+    conn.close()
+
+
+def start_self_hosted(port, threads):
+    # Minimal stand-in for a running bot: a real TaskManager-shaped object is
+    # not needed for /status, only the attributes the route reads.
+    import bot as bot_module
+    import http_server
+    from overlay_cache import CachedJSON
+
+    class TimerStub:
+        state_version = 1
+
+        def remaining_seconds(self):
+            return 0
+
+        def timer_snapshot(self):
+            return {"remaining_seconds": 0, "phase": "", "pomodoro_count": 0,
+                    "max_pomodoros": 4, "total_completed": 0, "paused": False}
+
+    class ChannelStub:
+        task_manager = TimerStub()
+        status_view = CachedJSON(task_manager.timer_snapshot)
+
+    class BotStub:
+        default_channel = ChannelStub()
+        channels = {}
+
+    bot_module.bot = BotStub()
+    return http_server.serve(bot_module.app, '127.0.0.1', port, threads=threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure overlay endpoint throughput")
+    parser.add_argument('--url', default='http://127.0.0.1:5000/status')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--revalidate', action='store_true')
+    parser.add_argument('--self-host', action='store_true')
+    parser.add_argument('--server-threads', type=int, default=16)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.self_host:
+        server = start_self_hosted(urlsplit(args.url).port or 5000, args.server_threads)
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=client, args=(args.url, deadline, args.revalidate, latencies, errors))
+        for _ in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if server:
+        server.graceful_shutdown()
+
+    latencies.sort()
+    result = {
+        'url': args.url,
+        'clients': args.clients,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3) if latencies else None,
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
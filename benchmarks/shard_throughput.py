@@ -0,0 +1,121 @@
+"""
+Chat throughput of the sharded supervisor against the local fake IRC server, by worker count.
+
+    python benchmarks/shard_throughput.py [--workers 1,2,4] [--channels 16] [--messages 100000] [--json out.json]
+
+Every channel gets the same share of tagged chat lines, then one '!lurk'
+sentinel. A shard handles its lines in order, so once every sentinel's
+reply is back, every line has been parsed and dispatched.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fake_irc import FakeIRCServer  # noqa: E402
+from supervisor import Supervisor  # noqa: E402
+
+TAGS = ("badge-info=subscriber/14;badges=subscriber/12,premium/1;color=#1E90FF;display-name={user};"
+        "emotes=;first-msg=0;flags=;id=7c1b{n:08x}-1f2e-4d3c-9b8a-0f1e2d3c4b5a;mod=0;returning-chatter=0;"
+        "room-id=12345678;subscriber=1;tmi-sent-ts=1700000000000;turbo=0;user-id={n};user-type=")
+TEXTS = [
+    "good morning everyone, back to the thesis today",
+    "how long is the focus block?",
+    "finished my reading, starting on the exercises now",
+    "lofi + pomodoro is the best combo",
+    "brb getting coffee",
+]
+
+
+def write_silent_sound(directory):
+    # TaskManager loads sounds/complete.mp3 when audio is on; any format pygame can decode will do
+    os.makedirs(os.path.join(directory, 'sounds'), exist_ok=True)
+    with wave.open(os.path.join(directory, 'sounds', 'complete.mp3'), 'wb') as sound:
+        sound.setnchannels(1)
+        sound.setsampwidth(2)
+        sound.setframerate(22050)
+        sound.writeframes(b'\0\0' * 100)
+
+
+def build_chat(channels, messages):
+    chat = []
+    for n in range(messages):
+        user = f"viewer{n % 5000}"
+        chat.append((user, channels[n % len(channels)], TEXTS[n % len(TEXTS)], TAGS.format(user=user, n=n)))
+    chat.extend((f"sentinel_{channel}", channel, "!lurk", None) for channel in channels)
+    return chat
+
+
+def run_once(server, loop, workers, channels, chat, base_port, timeout):
+    workdir = tempfile.mkdtemp(prefix='shard-bench-')
+    write_silent_sound(workdir)
+    env = dict(os.environ,
+               TWITCH_IRC_HOST='127.0.0.1', TWITCH_IRC_PORT=str(server.port),
+               TWITCH_BOT_USERNAME='benchbot', TWITCH_OAUTH_TOKEN='oauth:bench', ADMIN_USER='benchadmin',
+               SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    supervisor = Supervisor(channels, workers, base_port, data_dir=os.path.join(workdir, 'channels'),
+                            env=env, cwd=workdir).start()
+    try:
+        deadline = time.monotonic() + timeout
+        while sum(len(joined) for joined in list(server.joined.values())) < len(channels):
+            if time.monotonic() > deadline:
+                raise RuntimeError("shards did not join every channel in time")
+            time.sleep(0.1)
+
+        already = len(server.received)
+        pending = {f"PRIVMSG #{channel} :thanks for lurking sentinel_{channel}!" for channel in channels}
+        start = time.perf_counter()
+        loop.call_soon_threadsafe(server.send_chat, chat)
+        while pending:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{len(pending)} channels never answered their sentinel")
+            received = server.received[already:]
+            already += len(received)
+            pending.difference_update(received)
+            time.sleep(0.005)
+        return time.perf_counter() - start
+    finally:
+        supervisor.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--channels', type=int, default=16)
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--base-port', type=int, default=18100)
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = asyncio.run_coroutine_threadsafe(FakeIRCServer().start(), loop).result()
+
+    channels = [f"room{i:03d}" for i in range(args.channels)]
+    chat = build_chat(channels, args.messages)
+    results = []
+    for workers in (int(count) for count in args.workers.split(',')):
+        seconds = run_once(server, loop, workers, channels, chat, args.base_port, args.timeout)
+        results.append({'workers': workers, 'messages': len(chat), 'seconds': round(seconds, 3),
+                        'messages_per_second': round(len(chat) / seconds)})
+
+    print(f"{args.channels} channels, {len(chat)} chat lines, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'seconds':>10}{'msgs/s':>10}{'speedup':>9}")
+    for result in results:
+        speedup = result['messages_per_second'] / results[0]['messages_per_second']
+        print(f"{result['workers']:>8}{result['seconds']:>10.2f}{result['messages_per_second']:>10}{speedup:>8.2f}x")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'channels': args.channels, 'cpus': os.cpu_count(), 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import bisect
+import gzip
+import heapq
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import date
+
+from task_record import iso_from_ordinal
+
+# One rollup record: day ordinal and user count, then three columns of that length
+RECORD_HEADER = struct.Struct('<II')
+# Per-user, per-day counts are stored as unsigned 16-bit values
+MAX_COUNT = 0xFFFF
+
+
+def little_endian(column):
+    # Rollup files are little-endian whatever the host
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def read_column(typecode, data, offset, length):
+    column = array(typecode)
+    column.frombytes(data[offset:offset + length * column.itemsize])
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column, offset + length * column.itemsize
+
+
+class TaskArchive:
+    """
+    History of the tasks clean_old_tasks drops at the end of each day.
+
+    Raw tasks go to one append-only gzip segment per day under
+    `<directory>/segments/`, only read back on request. What the queries need is
+    kept as rollups: for each day, parallel arrays of user IDs, tasks
+    completed and tasks added, appended to `rollups.bin` (user names live
+    in `users.txt`, one per line, the line number being the ID). From those,
+    per-user totals and sorted arrays of active days are built at load, so
+    streaks, leaderboards and all-time stats never touch the segments.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments_dir = os.path.join(directory, 'segments')
+        self.users_path = os.path.join(directory, 'users.txt')
+        self.rollups_path = os.path.join(directory, 'rollups.bin')
+        self.lock = threading.Lock()
+        self.users = []  # user ID -> name
+        self.user_ids = {}
+        self.days = {}  # day ordinal -> (user IDs, completed, added) arrays
+        self.totals = {}  # user ID -> [completed, added]
+        self.active_days = {}  # user ID -> sorted array of days with a completed task
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.users_path):
+            with open(self.users_path, 'rb') as f:
+                raw = f.read()
+            good_length = raw.rfind(b'\n') + 1
+            for name in raw[:good_length].decode('utf-8').splitlines():
+                self.register_user(name)
+            if good_length < len(raw):
+                with open(self.users_path, 'r+b') as f:
+                    f.truncate(good_length)
+        if not os.path.exists(self.rollups_path):
+            return
+        with open(self.rollups_path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            start = offset
+            try:
+                day, length = RECORD_HEADER.unpack_from(data, offset)
+                offset += RECORD_HEADER.size
+                ids, offset = read_column('I', data, offset, length)
+                completed, offset = read_column('H', data, offset, length)
+                added, offset = read_column('H', data, offset, length)
+                if len(added) < length or (length and max(ids) >= len(self.users)):
+                    raise ValueError("incomplete record")
+            except (struct.error, ValueError):
+                # Same as the journal: a crash mid-append leaves at most one torn record
+                print(f"Ignoring truncated record at end of {self.rollups_path}")
+                with open(self.rollups_path, 'r+b') as f:
+                    f.truncate(start)
+                break
+            self.apply_rollup(day, ids, completed, added)
+
+    def register_user(self, name):
+        user_id = self.user_ids.get(name)
+        if user_id is None:
+            name = sys.intern(name)
+            user_id = self.user_ids[name] = len(self.users)
+            self.users.append(name)
+            self.totals[user_id] = [0, 0]
+        return user_id
+
+    def apply_rollup(self, day, ids, completed, added):
+        # A later record for the same day replaces the earlier one
+        previous = self.days.get(day)
+        if previous is not None:
+            for user_id, done, count in zip(*previous):
+                totals = self.totals[user_id]
+                totals[0] -= done
+                totals[1] -= count
+                if done:
+                    days = self.active_days[user_id]
+                    del days[bisect.bisect_left(days, day)]
+        self.days[day] = (ids, completed, added)
+        for user_id, done, count in zip(ids, completed, added):
+            totals = self.totals[user_id]
+            totals[0] += done
+            totals[1] += count
+            if done:
+                days = self.active_days.setdefault(user_id, array('I'))
+                if not days or days[-1] < day:
+                    days.append(day)
+                else:
+                    days.insert(bisect.bisect_left(days, day), day)
+
+    def segment_path(self, day):
+        return os.path.join(self.segments_dir, f"{iso_from_ordinal(day)}.json.gz")
+
+    def read_segment(self, day):
+        # Returns {task_id: task JSON} for one archived day
+        path = self.segment_path(day)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'rb') as f:
+            data = gzip.decompress(f.read())
+        tasks = {}
+        for line in data.splitlines():
+            columns = json.loads(line)
+            for task_id, user, description, completed in zip(
+                    columns['ids'], columns['users'], columns['descriptions'], columns['completed']):
+                tasks[task_id] = {"description": description, "completed": completed, "user": user,
+                                  "date": iso_from_ordinal(day)}
+        return tasks
+
+    def archive_day(self, day, tasks):
+        """
+        Append (task_id, Task) pairs from one past day. Safe to repeat after
+        a crash: tasks already in the day's segment are skipped, and the
+        day's rollup is recomputed from the whole segment.
+        """
+        with self.lock:
+            os.makedirs(self.segments_dir, exist_ok=True)
+            existing = self.read_segment(day)
+            new = [(task_id, task) for task_id, task in tasks if task_id not in existing]
+            if new:
+                columns = {
+                    'ids': [task_id for task_id, _ in new],
+                    'users': [task.user for _, task in new],
+                    'descriptions': [task.description for _, task in new],
+                    'completed': [task.completed for _, task in new],
+                }
+                # Each batch is its own gzip member; gzip reads concatenated members as one stream
+                member = gzip.compress(json.dumps(columns, separators=(',', ':')).encode('utf-8') + b'\n')
+                with open(self.segment_path(day), 'ab') as f:
+                    f.write(member)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            counts = {}
+            rows = [(task['user'], task['completed']) for task in existing.values()]
+            rows += [(task.user, task.completed) for _, task in new]
+            for user, completed in rows:
+                count = counts.setdefault(user, [0, 0])
+                count[0] += bool(completed)
+                count[1] += 1
+            self.write_rollup(day, counts)
+
+    def write_rollup(self, day, counts):
+        new_users = [user for user in counts if user not in self.user_ids]
+        if new_users:
+            # Names first, so a rollup record never refers to an unknown ID
+            with open(self.users_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(f"{user}\n" for user in new_users))
+                f.flush()
+                os.fsync(f.fileno())
+            for user in new_users:
+                self.register_user(user)
+
+        ids = array('I', sorted(self.user_ids[user] for user in counts))
+        completed = array('H', (min(counts[self.users[user_id]][0], MAX_COUNT) for user_id in ids))
+        added = array('H', (min(counts[self.users[user_id]][1], MAX_COUNT) for user_id in ids))
+        with open(self.rollups_path, 'ab') as f:
+            f.write(RECORD_HEADER.pack(day, len(ids)))
+            for column in (ids, completed, added):
+                f.write(little_endian(column).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.apply_rollup(day, ids, completed, added)
+
+    def completed_between(self, first_day, last_day):
+        # {user ID: tasks completed} over archived days first_day..last_day inclusive
+        scores = {}
+        with self.lock:
+            for day in range(first_day, last_day + 1):
+                rollup = self.days.get(day)
+                if rollup is None:
+                    continue
+                for user_id, done in zip(rollup[0], rollup[1]):
+                    if done:
+                        scores[user_id] = scores.get(user_id, 0) + done
+        return {self.users[user_id]: done for user_id, done in scores.items()}
+
+    def completed_all_time(self):
+        with self.lock:
+            return {self.users[user_id]: totals[0] for user_id, totals in self.totals.items() if totals[0]}
+
+    def user_summary(self, user):
+        # All-time counts and active-day span for one user, straight from the rollups
+        with self.lock:
+            user_id = self.user_ids.get(user)
+            if user_id is None:
+                return {"completed": 0, "added": 0, "active_days": 0, "first_day": None, "last_day": None}
+            days = self.active_days.get(user_id, ())
+            return {
+                "completed": self.totals[user_id][0],
+                "added": self.totals[user_id][1],
+                "active_days": len(days),
+                "first_day": iso_from_ordinal(days[0]) if days else None,
+                "last_day": iso_from_ordinal(days[-1]) if days else None,
+            }
+
+    def streaks(self, user, today, active_today=False):
+        """
+        (current, longest) runs of consecutive days with a completed task.
+        The current streak is still alive if it ended yesterday; today's
+        live tasks aren't archived yet, so the caller says whether today counts.
+        """
+        with self.lock:
+            days = self.active_days.get(self.user_ids.get(user), array('I'))
+            longest = run = 0
+            previous = None
+            for day in days:
+                run = run + 1 if previous == day - 1 else 1
+                longest = max(longest, run)
+                previous = day
+        current = run if days and days[-1] == today - 1 else 0
+        if active_today:
+            current += 1
+            longest = max(longest, current)
+        return current, longest
+
+
+def top(scores, limit):
+    # [(user, score)] highest first, ties by name
+    return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+PERIODS = ('week', 'month', 'all')
+
+
+def period_start(period, today):
+    # First day ordinal of the calendar week (Monday) or month containing `today`
+    day = date.fromordinal(today)
+    if period == 'week':
+        return today - day.weekday()
+    if period == 'month':
+        return day.replace(day=1).toordinal()
+    raise ValueError(f"Unknown period: {period}")
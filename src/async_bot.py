@@ -0,0 +1,226 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+
+import bot as bot_module
+import async_http
+from bot import TwitchBot, app, seconds_until_midnight, IRC_HANDLE_SECONDS, RECV_TIMEOUT
+from connection import CONNECT_TIMEOUT
+from events import MAX_PENDING_EVENTS, KEEPALIVE_INTERVAL, format_sse
+from timer_scheduler import AsyncioScheduler
+
+
+class AsyncTwitchBot(TwitchBot):
+    """
+    Runs the IRC connection, timer ticks, daily maintenance and the overlay
+    HTTP server as tasks on one asyncio event loop. Everything that touches
+    TaskManager happens on the loop thread, so no locking is needed.
+    """
+
+    def __init__(self, http_host='0.0.0.0', http_port=5000, dashboard=None):
+        super().__init__()
+        self.http_host = http_host
+        self.http_port = http_port
+        # Defaults to on unless BOT_HEADLESS is set
+        self.dashboard = not self.headless if dashboard is None else dashboard
+        self.reader = None
+        self.writer = None
+        self.send_wakeup = None
+
+    async def connect_async(self):
+        self.close_connection()
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.irc_host, self.irc_port), CONNECT_TIMEOUT)
+            self.irc_buffer.clear()
+            self.connection.connection_opened()
+            self.send_raw("\n".join(self.login_lines()))
+            await self.writer.drain()
+            print("Connected to Twitch IRC")
+        except (OSError, asyncio.TimeoutError) as e:
+            print(f"Error connecting to Twitch IRC: {e!r}")
+            if not self.connection.connection_lost(f"login failed: {e!r}"):
+                self.connection.connect_failed(f"connect failed: {e!r}")
+            self.close_connection()
+
+    def close_connection(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+    def close_socket(self):
+        # Only reached from shutdown() once asyncio.run has returned: main() already
+        # closed the transport, and closing it again would need the closed loop
+        self.reader = None
+        self.writer = None
+
+    def send_raw(self, line):
+        if self.writer is None or self.writer.is_closing():
+            raise ConnectionError("Not connected to Twitch IRC")
+        # Buffered by the transport; flushed by the IRC loop without blocking callers
+        self.writer.write(f"{line}\n".encode('utf-8'))
+
+    async def irc_loop(self):
+        while True:
+            if not self.connected:
+                self.close_connection()
+                delay = self.connection.next_delay()
+                if delay:
+                    print(f"Reconnecting in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                await self.connect_async()
+                continue
+
+            try:
+                data = await asyncio.wait_for(self.reader.read(4096), RECV_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.check_keepalive()
+                continue
+            except OSError as e:
+                self.disconnect(f"receive failed: {e}")
+                continue
+            if not data:
+                self.disconnect("connection closed by server")
+                continue
+
+            received = time.perf_counter()
+            for irc_message in self.irc_buffer.feed_messages(data):
+                if not self.connected:
+                    break
+                try:
+                    self.handle_irc_message(irc_message)
+                except Exception as e:
+                    print(f"Error handling IRC message: {e}")
+                IRC_HANDLE_SECONDS.observe(time.perf_counter() - received, irc_message.command)
+            self.check_keepalive()
+            if self.connected:
+                try:
+                    await self.writer.drain()
+                except OSError as e:
+                    self.disconnect(f"send failed: {e}")
+
+    async def send_loop(self):
+        while True:
+            # Messages queued during an outage stay queued until the bot has rejoined
+            if self.connection.ready.is_set():
+                item = self.send_queue.pop_ready()
+                if item:
+                    channel, text = item
+                    try:
+                        self.send_raw(f"PRIVMSG #{channel} :{text}")
+                        await self.writer.drain()
+                        self.send_queue.mark_sent()
+                    except OSError as e:
+                        print(f"Error sending message: {e}")
+                        self.send_queue.requeue(channel, text)
+                        self.connection.connection_lost(f"send failed: {e}")
+                    continue
+                delay = self.send_queue.wait_time()
+            else:
+                delay = None  # woken by on_ready
+            self.send_wakeup.clear()
+            try:
+                await asyncio.wait_for(self.send_wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dashboard_loop(self):
+        while True:
+            self.task_manager.render_dashboard()
+            await asyncio.sleep(1)
+
+    async def maintenance_loop(self):
+        while True:
+            await asyncio.sleep(seconds_until_midnight())
+            self.run_daily_maintenance()
+
+    def events_route(self, channel=None):
+        # Stream route for the Flask events_stream endpoint; unknown channels get Flask's 404
+        if channel is None:
+            return self.events_stream()
+        channel = self.channels.get(channel.lower())
+        return self.events_stream(channel) if channel is not None else None
+
+    async def events_stream(self, channel=None):
+        # Async twin of the Flask /events routes, so open streams don't tie up the loop
+        tm = (channel or self.default_channel).task_manager
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(MAX_PENDING_EVENTS)
+
+        def on_event(event, data):
+            loop.call_soon_threadsafe(self.queue_event, queue, event, data)
+
+        token = tm.events.subscribe(on_event)
+        try:
+            yield format_sse('snapshot', tm.overlay_snapshot())
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event == 'resync':
+                    yield format_sse('snapshot', tm.overlay_snapshot())
+                else:
+                    yield format_sse(event, data)
+        finally:
+            tm.events.unsubscribe(token)
+
+    @staticmethod
+    def queue_event(queue, event, data):
+        if queue.full():
+            # The client fell behind; replace its backlog with a fresh snapshot
+            while not queue.empty():
+                queue.get_nowait()
+            event, data = 'resync', None
+        queue.put_nowait((event, data))
+
+    async def main(self):
+        loop = asyncio.get_running_loop()
+        self.send_wakeup = asyncio.Event()
+        self.send_queue.on_put = lambda: loop.call_soon_threadsafe(self.send_wakeup.set)
+        self.connection.on_ready = lambda: loop.call_soon_threadsafe(self.send_wakeup.set)
+        # Phase deadlines fire on the loop, like every other handler in this mode
+        scheduler = AsyncioScheduler(loop)
+        for channel in self.channels.values():
+            channel.task_manager.attach_scheduler(scheduler)
+        # Matched through the Flask URL map, so /<channel>/events in any spelling streams here
+        stream_routes = {'events_stream': self.events_route}
+        server = await async_http.start_server(app, self.http_host, self.http_port,
+                                               stream_routes=stream_routes)
+        print(f"Overlay server running on http://localhost:{self.http_port}/timer and /status")
+        loop.run_in_executor(None, self.warm_up)
+        loops = [self.irc_loop(), self.send_loop(), self.maintenance_loop()]
+        if self.dashboard:
+            loops.append(self.dashboard_loop())
+        try:
+            async with server:
+                await asyncio.gather(*loops)
+        finally:
+            # Close the IRC connection while the loop still runs
+            writer = self.writer
+            self.close_connection()
+            if writer is not None:
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+
+    def run(self):
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+
+if __name__ == "__main__":
+    # SIGTERM (a process manager, or the shard supervisor) shuts down the same way as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # The Flask routes look the bot up through bot.bot
+    bot_module.bot = AsyncTwitchBot(http_port=int(os.getenv('HTTP_PORT', '5000')))
+    bot_module.bot.run()
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import sys
+from urllib.parse import unquote
+
+from werkzeug.exceptions import HTTPException
+
+# How long an idle keep-alive connection is kept open
+KEEPALIVE_TIMEOUT = 15
+
+BAD_REQUEST_RESPONSE = b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+
+
+def build_environ(method, target, version, headers, body, server_name, server_port):
+    path, _, query = target.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote(path, encoding='latin-1'),
+        'QUERY_STRING': query,
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': version,
+        'CONTENT_TYPE': headers.get('content-type', ''),
+        'CONTENT_LENGTH': headers.get('content-length', ''),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        if name in ('content-type', 'content-length'):
+            continue
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+def call_wsgi(app, environ):
+    response = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        response['status'] = status
+        response['headers'] = response_headers
+
+    result = app(environ, start_response)
+    try:
+        content_type = dict((name.lower(), value) for name, value in response['headers']).get('content-type', '')
+        if content_type.startswith('text/event-stream'):
+            # An endless stream would never finish joining and the loop would hang with it;
+            # streams are only served through stream_routes
+            print(f"Refusing to buffer an event stream for {environ['PATH_INFO']}")
+            return '500 Internal Server Error', [('Content-Type', 'text/plain')], b''
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+def match_stream_route(app, environ, stream_routes):
+    """
+    Resolve the request through the app's URL map, so every spelling Flask
+    would route to a streaming endpoint (percent-escapes, channel case)
+    is served as a stream too. Returns the async generator, or None to
+    let the WSGI app answer (including its 404s).
+    """
+    try:
+        endpoint, view_args = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    route = stream_routes.get(endpoint)
+    return route(**view_args) if route is not None else None
+
+
+async def read_request(reader):
+    request_line = await asyncio.wait_for(reader.readline(), timeout=KEEPALIVE_TIMEOUT)
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').rstrip('\r\n').split(' ')
+    if len(parts) != 3:
+        raise ValueError("Malformed request line")
+    method, target, version = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    body = b''
+    length = int(headers.get('content-length') or 0)
+    if length:
+        body = await reader.readexactly(length)
+    return method, target, version, headers, body
+
+
+async def write_stream(writer, stream):
+    # Streaming responses (SSE) are written as they are produced, until the client leaves
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                 b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+    async for chunk in stream:
+        writer.write(chunk.encode('utf-8'))
+        await writer.drain()
+
+
+async def handle_connection(app, reader, writer, stream_routes):
+    server_name, server_port = writer.get_extra_info('sockname')[:2]
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ValueError:
+                writer.write(BAD_REQUEST_RESPONSE)
+                break
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            environ = build_environ(method, target, version, headers, body, server_name, server_port)
+
+            if method == 'GET' and stream_routes:
+                stream = match_stream_route(app, environ, stream_routes)
+                if stream is not None:
+                    await write_stream(writer, stream)
+                    break
+
+            # The WSGI app runs inline on the event loop: every endpoint only
+            # reads in-memory bot state, so there is nothing worth a thread for.
+            status, response_headers, response_body = call_wsgi(app, environ)
+
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            header_names = {name.lower() for name, _ in response_headers}
+            lines = [f"HTTP/1.1 {status}"]
+            lines.extend(f"{name}: {value}" for name, value in response_headers)
+            if 'content-length' not in header_names:
+                lines.append(f"Content-Length: {len(response_body)}")
+            lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+            if method != 'HEAD':
+                writer.write(response_body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except asyncio.CancelledError:
+        # Shutdown cancels idle keep-alive connections and open streams; end them
+        # quietly rather than as errors logged by the stream protocol
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(app, host='0.0.0.0', port=5000, stream_routes=None):
+    # stream_routes maps a Flask endpoint name to a function taking its view arguments and
+    # returning an async generator of response chunks, or None to leave the request to Flask
+    stream_routes = stream_routes or {}
+    return await asyncio.start_server(
+        lambda reader, writer: handle_connection(app, reader, writer, stream_routes), host, port
+    )
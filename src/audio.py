@@ -0,0 +1,164 @@
+import os
+import queue
+import threading
+
+PHASES = ('focus', 'short_break', 'long_break')
+SOUNDS_DIR = 'sounds'
+# Played for any phase without its own sounds/<phase>.mp3
+DEFAULT_SOUND = 'complete.mp3'
+# Notifications waiting beyond this are dropped: a chime minutes late is worse than none
+MAX_PENDING = 8
+
+
+def sound_path(phase):
+    path = os.path.join(SOUNDS_DIR, f"{phase}.mp3")
+    if not os.path.exists(path):
+        path = os.path.join(SOUNDS_DIR, DEFAULT_SOUND)
+    return os.path.abspath(path)
+
+
+class NullSink:
+    """For headless servers: notifications go nowhere."""
+    name = 'none'
+
+    def preload(self):
+        pass
+
+    def play(self, phase, volume):
+        pass
+
+
+class HostSink:
+    """
+    Plays on the bot's own machine through pygame. pygame is imported and
+    the mixer opened on the audio worker, on first use. Decoded sounds are
+    cached by file and shared by every channel; the volume is applied per
+    playback, so !volume never reloads a sound.
+    """
+    name = 'host'
+
+    def __init__(self):
+        self.mixer = None
+        self.unavailable = False  # no audio device: reported once, then stay quiet
+        self.sounds = {}  # path -> pygame Sound
+
+    def sound(self, phase):
+        path = sound_path(phase)
+        sound = self.sounds.get(path)
+        if sound is None:
+            if self.mixer is None:
+                try:
+                    import pygame
+                    pygame.mixer.init()
+                except Exception:
+                    self.unavailable = True
+                    raise
+                self.mixer = pygame.mixer
+            sound = self.sounds[path] = self.mixer.Sound(path)
+        return sound
+
+    def preload(self):
+        if self.unavailable:
+            return
+        for phase in PHASES:
+            self.sound(phase)
+
+    def play(self, phase, volume):
+        if self.unavailable:
+            return
+        # The worker plays one sound at a time, so setting the shared Sound's volume here is safe
+        sound = self.sound(phase)
+        sound.set_volume(volume)
+        sound.play()
+
+
+class BrowserSink:
+    """
+    Sends a "sound" event to the channel's overlays, which play it in the
+    browser (OBS) instead of on the host.
+    """
+    name = 'browser'
+
+    def __init__(self, events):
+        self.events = events
+
+    def preload(self):
+        pass
+
+    def play(self, phase, volume):
+        self.events.publish('sound', {'phase': phase, 'volume': volume})
+
+
+class AudioWorker:
+    """
+    Plays notifications on a daemon thread behind a bounded queue, so a
+    slow or broken audio device never stalls the timer, the dashboard or
+    chat. Shared by every channel in the process.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.queue = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.played = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def submit(self, job):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def play(self, sink, phase, volume):
+        return self.submit((sink, phase, volume))
+
+    def preload(self, sink):
+        return self.submit((sink, None, None))
+
+    def run(self):
+        while True:
+            sink, phase, volume = self.queue.get()
+            try:
+                if phase is None:
+                    sink.preload()
+                else:
+                    sink.play(phase, volume)
+                    self.played += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Error playing sound: {e}")
+            finally:
+                self.queue.task_done()
+
+    def stats(self):
+        return {
+            "pending": self.queue.qsize(),
+            "played": self.played,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+# Host playback needs one mixer and one cache per process, whatever the channel count
+host_sink = HostSink()
+shared_worker = AudioWorker()
+NULL_SINK = NullSink()
+
+SINKS = ('host', 'browser', 'none')
+
+
+def create_sink(kind, events=None):
+    if kind == 'host':
+        return host_sink
+    if kind == 'browser':
+        return BrowserSink(events)
+    if kind == 'none':
+        return NULL_SINK
+    raise ValueError(f"Unknown sound sink: {kind}")
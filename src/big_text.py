@@ -0,0 +1,109 @@
+from functools import lru_cache
+
+# Distinct "MM:SS" strings a timer can show is 60 * 60; more than that per font is never needed
+RENDER_CACHE_SIZE = 3600
+
+BLOCK_GLYPHS = {
+    '0': ["█████",
+          "█   █",
+          "█   █",
+          "█   █",
+          "█████"],
+    '1': ["  █  ",
+          "  █  ",
+          "  █  ",
+          "  █  ",
+          "  █  "],
+    '2': ["█████",
+          "    █",
+          "█████",
+          "█    ",
+          "█████"],
+    '3': ["█████",
+          "    █",
+          "█████",
+          "    █",
+          "█████"],
+    '4': ["█   █",
+          "█   █",
+          "█████",
+          "    █",
+          "    █"],
+    '5': ["█████",
+          "█    ",
+          "█████",
+          "    █",
+          "█████"],
+    '6': ["█████",
+          "█    ",
+          "█████",
+          "█   █",
+          "█████"],
+    '7': ["█████",
+          "    █",
+          "    █",
+          "    █",
+          "    █"],
+    '8': ["█████",
+          "█   █",
+          "█████",
+          "█   █",
+          "█████"],
+    '9': ["█████",
+          "█   █",
+          "█████",
+          "    █",
+          "█████"],
+    ':': ["  ",
+          "██",
+          "  ",
+          "██",
+          "  "],
+}
+
+SMALL_GLYPHS = {
+    '0': ["█▀█", "█ █", "█▄█"],
+    '1': [" ▀█", "  █", "  █"],
+    '2': ["▀▀█", "█▀▀", "█▄▄"],
+    '3': ["▀▀█", " ▀█", "▄▄█"],
+    '4': ["█ █", "▀▀█", "  █"],
+    '5': ["█▀▀", "▀▀█", "▄▄█"],
+    '6': ["█▀▀", "█▀█", "█▄█"],
+    '7': ["▀▀█", "  █", "  █"],
+    '8': ["█▀█", "█▀█", "█▄█"],
+    '9': ["█▀█", "▀▀█", "▄▄█"],
+    ':': [" ", "▀", "▀"],
+}
+
+
+class BigFont:
+    """
+    Glyph atlas for the big timer digits. Each glyph row is stored with its
+    trailing gap already attached, so a line is one str.join, and whole
+    rendered strings are memoized (bounded by RENDER_CACHE_SIZE).
+    """
+
+    def __init__(self, glyphs, gap="  "):
+        self.height = len(next(iter(glyphs.values())))
+        self.glyphs = {char: tuple(row + gap for row in rows) for char, rows in glyphs.items()}
+        self.render = lru_cache(maxsize=RENDER_CACHE_SIZE)(self.render_uncached)
+
+    def render_uncached(self, text):
+        # Characters without a glyph are skipped
+        glyphs = [self.glyphs[char] for char in text if char in self.glyphs]
+        return "\n".join("".join(glyph[row] for glyph in glyphs) for row in range(self.height))
+
+
+FONTS = {
+    'block': BigFont(BLOCK_GLYPHS),
+    'small': BigFont(SMALL_GLYPHS, gap=" "),
+}
+DEFAULT_FONT = 'block'
+
+
+def get_font(name):
+    if name not in FONTS:
+        print(f"Unknown timer font '{name}', using '{DEFAULT_FONT}'")
+        name = DEFAULT_FONT
+    return FONTS[name]
+
@@ -1,419 +1,516 @@
 import socket
-import re
 import os
+import signal
+import sys
 from dotenv import load_dotenv
-from task_manager import TaskManager
+from channel import Channel, channel_data_path
+from irc import LineBuffer
+from send_queue import OutboundQueue, PRIORITY_NORMAL
+from commands import create_router, load_plugins
+from connection import ConnectionManager, CONNECT_TIMEOUT
+from metrics import CONTENT_TYPE, registry
+from audio import PHASES, SINKS, shared_worker as audio_worker, sound_path
+from archive import PERIODS
 import threading
 import time
 from datetime import datetime, date, timedelta
-from flask import Flask, jsonify, send_from_directory, render_template
-from task_manager import TaskManager
-
-# ─── Flask App Setup ─────────────────────────────────────────────────────────
-app = Flask(__name__)
-
-# These constants should mirror whatever TaskManager uses internally, if needed:
-# (Alternatively, TaskManager may expose these via a get_status() method.)
-MAX_POMODOROS = 4  # only used if TaskManager doesn't expose this
-
-@app.route("/")
-def index():
-    """
-    Serve the timer.html file from the templates/ directory.
-    Make sure you have a folder named `templates/` alongside this Python file,
-    and inside it place the exact `timer.html` you built previously.
-    """
-    return render_template("overlay.html")
-
-
-@app.route("/status")
-def status():
-    """
-    Called by the front‐end every few seconds. Returns JSON with:
-      - remaining_seconds: how many seconds left in the current phase
-      - phase:            one of "focus", "short_break", "long_break"
-      - pomodoro_count:   how many focus sessions completed in this cycle
-      - max_pomodoros:    total allowed before a long break
-      - total_completed:  cumulative count of focus sessions
-    We assume TaskManager exposes a method get_status() returning exactly that dict.
-    If your TaskManager API is different, adjust accordingly.
-    """
-    # Fetch the current status directly from the TaskManager instance
-    # (the TwitchBot.__init__ will create twitch_bot.task_manager before Flask starts.)
-    tm = twitch_bot.task_manager
-
-    try:
-        # If TaskManager has a get_status() method, use it:
-        status_data = tm.get_status()
-    except AttributeError:
-        # Fallback: assume TaskManager exposes attributes / methods manually:
-        phase = tm.current_phase            # e.g. "focus" / "short_break" / "long_break"
-        remaining = tm.get_remaining_seconds()  # leftover seconds in this phase
-        pom_count = tm.pomodoro_count       # how many focus sessions done in this cycle
-        total_done = tm.total_completed     # cumulative count
-        status_data = {
-            "remaining_seconds": remaining,
-            "phase":             phase,
-            "pomodoro_count":    pom_count,
-            "max_pomodoros":     MAX_POMODOROS,
-            "total_completed":   total_done
-        }
-
-    return jsonify(status_data)
-
-
-@app.route("/twitch_tasks.json")
-def tasks_json():
-    """
-    Serve the JSON file containing tasks. Place `twitch_tasks.json`
-    in the same directory as this script. If it doesn’t exist yet,
-    return an empty structure so the front‐end never breaks.
-    """
-    file_path = os.path.join(app.root_path, "twitch_tasks.json")
-    if not os.path.exists(file_path):
-        return jsonify({"tasks": {}, "user_stats": {}})
-    return send_from_directory(app.root_path, "twitch_tasks.json")
-
-
 
 # ─── Flask imports & setup ────────────────────────────────────────────────────
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, Response, abort, g, jsonify, request, send_file
 from threading import Thread
+from events import Subscription, format_sse
+import http_server
 
 # Tell Flask to look for static files in ./public
 app = Flask(__name__, static_folder="public", static_url_path="")
 
-# We keep a global reference to the bot so we can query its TaskManager
+# We keep a global reference to the bot so we can query its channels' TaskManagers
 bot = None  # will be set in __main__
 
-
-def get_timer_data():
+# Channels joined per JOIN line
+JOIN_BATCH = 20
+# BOT_AUDIO also takes plain on/off values
+AUDIO_ALIASES = {'1': 'host', 'true': 'host', 'yes': 'host', 'on': 'host',
+                 '0': 'none', 'false': 'none', 'no': 'none', 'off': 'none'}
+# How often the receive loop wakes up to check the keepalive when chat is quiet
+RECV_TIMEOUT = 1
+
+IRC_HANDLE_SECONDS = registry.histogram('twitchbot_irc_receive_to_handle_seconds',
+                                        "Time from reading a chunk off the IRC connection to having "
+                                        "handled each message in it", label='command')
+HTTP_SECONDS = registry.histogram('twitchbot_http_request_seconds', "Overlay HTTP request handling time",
+                                  label='route')
+SEND_QUEUE_DEPTH = registry.gauge('twitchbot_send_queue_depth', "Chat messages waiting in the outbound queue")
+MESSAGES_SENT = registry.counter('twitchbot_messages_sent_total', "Chat messages sent")
+MESSAGES_DROPPED = registry.counter('twitchbot_messages_dropped_total', "Chat messages dropped by a full queue")
+
+
+def find_channel(name=None):
+    # Unprefixed routes serve the first channel in TWITCH_CHANNEL
+    if name is None:
+        return bot.default_channel
+    channel = bot.channels.get(name.lower())
+    if channel is None:
+        abort(404)
+    return channel
+
+
+def get_timer_data(channel=None):
     """
-    Return a dict with:
+    Return a dict for the given channel (default: the first one) with:
       - remaining_seconds   (integer)
       - phase               (string: "focus", "short_break", or "long_break", or "" if no timer)
       - pomodoro_count      (int, how many focus sessions have completed so far in this cycle)
       - max_pomodoros       (int, usually 4)
       - total_completed     (int, total number of pomodoros completed today)
+      - paused              (bool)
     """
-    tm = bot.task_manager
-    # If no timer has ever been started, tm.timer_start will be None
-    if not tm.timer_start:
-        return {
-            "remaining_seconds": 0,
-            "phase": "",
-            "pomodoro_count": tm.pomodoro_count,
-            "max_pomodoros": tm.max_pomodoros,
-            "total_completed": tm.total_completed_pomodoros
-        }
-
-    # If timer is paused, compute remaining as (timer_end - pause_start)
-    if tm.timer_paused and tm.timer_pause_start:
-        rem_delta = tm.timer_end - tm.timer_pause_start
-    else:
-        rem_delta = tm.timer_end - datetime.now()
-
-    rem_secs = int(rem_delta.total_seconds())
-    if rem_secs < 0:
-        rem_secs = 0
-
-    return {
-        "remaining_seconds": rem_secs,
-        "phase": tm.current_phase,             # "focus", "short_break", or "long_break"
-        "pomodoro_count": tm.pomodoro_count,    # e.g. how many focus sessions done so far
-        "max_pomodoros": tm.max_pomodoros,
-        "total_completed": tm.total_completed_pomodoros
-    }
+    return find_channel(channel).task_manager.timer_snapshot()
 
 
 @app.route("/timer")
-def timer_json():
+@app.route("/<channel>/timer")
+def timer_json(channel=None):
     """
     Legacy endpoint if you only want remaining seconds.
     """
-    data = get_timer_data()
+    data = get_timer_data(channel)
     return jsonify({"remaining": data["remaining_seconds"]})
 
 
+def cached_json_response(view, key):
+    """
+    Serve a CachedJSON view with ETag revalidation (304) and gzip when the
+    client accepts it. Cache-Control: no-cache makes browsers revalidate
+    each poll, which is a cheap 304 until the bot's state changes.
+    """
+    body, gzipped, etag = view.get(key)
+    if etag in request.headers.get("If-None-Match", ""):
+        response = Response(status=304)
+    elif gzipped is not None and "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = Response(gzipped, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(body, mimetype="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/<channel>/timer.html")
+def channel_overlay(channel):
+    # The overlay page fetches relative URLs, so under /<channel>/ it follows that channel
+    find_channel(channel)
+    return app.send_static_file("timer.html")
+
+
+@app.route("/sounds/<phase>")
+@app.route("/<channel>/sounds/<phase>")
+def phase_sound(phase, channel=None):
+    # Played by the overlay when BOT_AUDIO=browser
+    find_channel(channel)
+    if phase not in PHASES:
+        abort(404)
+    return send_file(sound_path(phase), mimetype="audio/mpeg", max_age=3600)
+
+
 @app.route("/status")
-def status_json():
+@app.route("/<channel>/status")
+def status_json(channel=None):
     """
     A richer endpoint that returns everything the console version prints.
+    Only re-serialized when the timer state or the displayed second changes.
     """
-    return jsonify(get_timer_data())
+    channel = find_channel(channel)
+    tm = channel.task_manager
+    return cached_json_response(channel.status_view, (tm.state_version, tm.remaining_seconds()))
+
+@app.route("/history")
+@app.route("/<channel>/history")
+def history_json(channel=None):
+    """
+    Archived task history: ?user=<name> for that user's totals and streaks,
+    otherwise the ?period=week|month|all leaderboard (top ?limit=, max 100).
+    """
+    tm = find_channel(channel).task_manager
+    user = request.args.get("user")
+    if user:
+        return jsonify({"user": user, **tm.get_user_history(user)})
+    period = request.args.get("period", "week")
+    limit = request.args.get("limit", 10, type=int)
+    if period not in PERIODS or not 0 < limit <= 100:
+        abort(400)
+    leaderboard = tm.history_leaderboard(period, limit)
+    return jsonify({"period": period,
+                     "leaderboard": [{"user": user, "completed": completed} for user, completed in leaderboard]})
+
+@app.route("/leaderboard")
+@app.route("/<channel>/leaderboard")
+def leaderboard_json(channel=None):
+    """
+    Today's and all-time completed-task rankings, top ?limit= (default 10,
+    max 100) of each, read from the incrementally sorted leaderboard.
+    """
+    leaderboard = find_channel(channel).task_manager.leaderboard
+    limit = request.args.get("limit", 10, type=int)
+    if not 0 < limit <= 100:
+        abort(400)
+    return jsonify({board: [{"rank": rank, "user": user, "completed": score}
+                            for rank, user, score in leaderboard.top(board, limit)]
+                    for board in ('daily', 'total')})
+
+@app.route("/queue")
+def queue_json():
+    """
+    Outbound chat queue depth, drop and coalesce counters, plus commands
+    suppressed by the per-viewer throttle before they reached the queue
+    and the audio worker's backlog.
+    """
+    return jsonify({**bot.send_queue.stats(), "commands": bot.commands.throttle.stats(),
+                    "audio": audio_worker.stats()})
+
+if registry.enabled:
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request_time(response):
+        # Label by route pattern, not the raw path, to keep the number of series bounded
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_SECONDS.observe(time.perf_counter() - g.request_started, rule)
+        return response
+
+@app.route("/metrics")
+def metrics_text():
+    """
+    Counters and latency histograms in Prometheus text format; empty when
+    BOT_METRICS=0.
+    """
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+@app.route("/connection")
+def connection_json():
+    """
+    IRC connection health: connects, drops, keepalive PINGs, RECONNECT
+    notices and how long the bot took to rejoin after recent outages.
+    """
+    return jsonify(bot.connection.stats())
 
 @app.route("/twitch_tasks.json")
-def serve_tasks_file():
-    # __file__ is bot.py; os.path.dirname(__file__) is the folder containing bot.py
-    folder = os.path.dirname(__file__)
-    return send_from_directory(folder, "twitch_tasks.json")
+@app.route("/<channel>/twitch_tasks.json")
+def serve_tasks_file(channel=None):
+    # Served from memory: the file on disk only catches up when the journal is compacted
+    channel = find_channel(channel)
+    return cached_json_response(channel.tasks_file_view, (channel.task_manager.state_version,))
+
+@app.route("/overlay.json")
+@app.route("/<channel>/overlay.json")
+def overlay_json(channel=None):
+    """
+    Just what the overlay draws: today's tasks, without user_stats.
+    """
+    channel = find_channel(channel)
+    return cached_json_response(channel.overlay_view, (channel.task_manager.state_version,))
 
-def run_flask():
+@app.route("/events")
+@app.route("/<channel>/events")
+def events_stream(channel=None):
+    """
+    Server-Sent Events stream for the overlay: one "snapshot" event with the
+    timer and today's tasks on connect, then "timer", "task_added",
+    "task_updated" and "tasks_removed" events as they happen.
+    """
+    tm = find_channel(channel).task_manager
+
+    def stream():
+        # Subscribe before taking the snapshot so no change falls in between
+        subscription = Subscription(tm.events)
+        try:
+            yield format_sse('snapshot', tm.overlay_snapshot())
+            while True:
+                item = subscription.get()
+                if item is None:
+                    yield ": keepalive\n\n"
+                elif item[0] == 'resync':
+                    yield format_sse('snapshot', tm.overlay_snapshot())
+                else:
+                    yield format_sse(*item)
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def run_flask(port=5000):
     # Turn off reloader so we don’t spawn two threads
-    app.run(host="0.0.0.0", port=5000, debug=False, use_reloader=False)
+    app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False)
+
+def seconds_until_midnight():
+    now = datetime.now()
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds()
 
 class TwitchBot:
     def __init__(self):
         load_dotenv()
         self.username = os.getenv('TWITCH_BOT_USERNAME')
         self.oauth_token = os.getenv('TWITCH_OAUTH_TOKEN')
-        self.channel = os.getenv('TWITCH_CHANNEL')
+        # TWITCH_CHANNEL may list several channels, comma-separated; all share one connection
+        names = [name.strip().lstrip('#').lower() for name in os.getenv('TWITCH_CHANNEL', '').split(',')]
+        names = list(dict.fromkeys(name for name in names if name)) or ['']
         self.admin_user = os.getenv('ADMIN_USER')  # Get admin user from .env file
-        self.socket = socket.socket()
-        self.connected = False
-        self.task_manager = TaskManager('twitch_tasks.json', self.on_phase_change)
-        self.lurkers = set()  # New set to store lurkers
+        self.irc_host = os.getenv('TWITCH_IRC_HOST', 'irc.chat.twitch.tv')
+        self.irc_port = int(os.getenv('TWITCH_IRC_PORT', '6667'))
+        self.socket = None
+        self.irc_buffer = LineBuffer()
+        self.send_queue = OutboundQueue()
+        self.connection = ConnectionManager(self.username, names)
+        SEND_QUEUE_DEPTH.set_function(self.send_queue.depth)
+        MESSAGES_SENT.set_function(lambda: self.send_queue.sent_count)
+        MESSAGES_DROPPED.set_function(lambda: self.send_queue.dropped_count)
+        # Headless hosts get no console dashboard and, unless BOT_AUDIO says otherwise, no sound
+        self.headless = os.getenv('BOT_HEADLESS', '').lower() in ('1', 'true', 'yes')
+        # Where phase-change sounds play: 'host' (pygame), 'browser' (the overlay) or 'none'
+        sound = os.getenv('BOT_AUDIO', 'none' if self.headless else 'host').lower()
+        sound = AUDIO_ALIASES.get(sound, sound)
+        if sound not in SINKS:
+            raise ValueError(f"BOT_AUDIO must be one of {', '.join(SINKS)} (or on/off), not {sound!r}")
+        # Setting CHANNEL_DATA_DIR (as shards do) gives even a lone channel its own directory
+        data_dir = os.getenv('CHANNEL_DATA_DIR') or ('channels' if len(names) > 1 else None)
+        storage = os.getenv('TASK_STORAGE', 'json')
+        self.channels = {
+            name: Channel(self, name, channel_data_path(name, data_dir), storage, sound)
+            for name in names
+        }
+        # The first channel also answers the unprefixed overlay routes and owns the dashboard
+        self.default_channel = self.channels[names[0]]
+        self.channel = self.default_channel.name
+        self.task_manager = self.default_channel.task_manager
+        self.lurkers = self.default_channel.lurkers
+        self.commands = create_router()
+        load_plugins(self.commands, os.getenv('BOT_PLUGINS', ''))
+
+    @property
+    def connected(self):
+        return self.connection.connected
 
     def connect(self):
+        self.close_socket()
         try:
-            self.socket = socket.socket()
-            self.socket.connect(('irc.chat.twitch.tv', 6667))
-            self.socket.send(f"PASS {self.oauth_token}\n".encode('utf-8'))
-            self.socket.send(f"NICK {self.username}\n".encode('utf-8'))
-            self.socket.send(f"JOIN #{self.channel}\n".encode('utf-8'))
-            self.connected = True
+            self.socket = socket.create_connection((self.irc_host, self.irc_port), timeout=CONNECT_TIMEOUT)
+            # Wake up regularly even when chat is quiet, for the keepalive
+            self.socket.settimeout(RECV_TIMEOUT)
+            # Chat lines are small, separate writes; Nagle would hold each one back for the previous ACK
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.irc_buffer.clear()
+            self.connection.connection_opened()
+            # The whole login in one write, so the server sees the JOINs without waiting on ACKs
+            self.send_raw("\n".join(self.login_lines()))
             print("Connected to Twitch IRC")
-        except Exception as e:
+        except OSError as e:
             print(f"Error connecting to Twitch IRC: {e}")
-            self.connected = False
-
-    def send_message(self, message):
+            if not self.connection.connection_lost(f"login failed: {e}"):
+                self.connection.connect_failed(f"connect failed: {e}")
+            self.close_socket()
+
+    def close_socket(self):
+        sock, self.socket = self.socket, None
+        if sock is None:
+            return
         try:
-            self.socket.send(f"PRIVMSG #{self.channel} :{message}\n".encode('utf-8'))
-        except Exception as e:
-            print(f"Error sending message: {e}")
-            self.connected = False
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def disconnect(self, reason, retry_now=False):
+        if self.connection.connection_lost(reason, retry_now):
+            print(f"Disconnected from Twitch IRC: {reason}")
+        self.close_socket()
+
+    def login_lines(self):
+        lines = [
+            "CAP REQ :twitch.tv/tags twitch.tv/commands",
+            f"PASS {self.oauth_token}",
+            f"NICK {self.username}",
+        ]
+        names = list(self.channels)
+        for start in range(0, len(names), JOIN_BATCH):
+            lines.append("JOIN " + ",".join(f"#{name}" for name in names[start:start + JOIN_BATCH]))
+        return lines
+
+    def send_raw(self, line):
+        sock = self.socket
+        if sock is None:
+            raise ConnectionError("Not connected to Twitch IRC")
+        sock.sendall(f"{line}\n".encode('utf-8'))
+
+    def send_message(self, message, priority=PRIORITY_NORMAL):
+        # Queued for the default channel; send_loop delivers it within Twitch's rate limits
+        self.default_channel.send_message(message, priority)
+
+    def send_loop(self):
+        while True:
+            # Messages queued during an outage wait here until the bot has rejoined
+            self.connection.ready.wait()
+            channel, text = self.send_queue.get()
+            if not self.connection.ready.is_set():
+                # The connection dropped while we waited for the queue
+                self.send_queue.requeue(channel, text)
+                continue
+            try:
+                self.send_raw(f"PRIVMSG #{channel} :{text}")
+            except OSError as e:
+                print(f"Error sending message: {e}")
+                self.send_queue.requeue(channel, text)
+                # The receive loop owns the socket; it notices and reconnects
+                self.connection.connection_lost(f"send failed: {e}")
+                continue
+            self.send_queue.mark_sent()
 
     def run(self):
-        if not self.connected:
-            self.connect()
+        for channel in self.channels.values():
+            channel.task_manager.attach_scheduler()
+        # Start the task display thread; the timer runs on its own scheduler either way
+        if not self.headless:
+            threading.Thread(target=self.task_manager.display_tasks, daemon=True).start()
 
-        # Start the task display thread
-        threading.Thread(target=self.task_manager.display_tasks, daemon=True).start()
+        threading.Thread(target=self.warm_up, daemon=True).start()
 
         # Start a thread to clean old tasks and reset daily stats
         threading.Thread(target=self.daily_maintenance, daemon=True).start()
 
+        # Start the outbound message thread
+        threading.Thread(target=self.send_loop, daemon=True).start()
+
         while True:
             if not self.connected:
-                print("Not connected. Attempting to reconnect...")
+                self.close_socket()
+                delay = self.connection.next_delay()
+                if delay:
+                    print(f"Reconnecting in {delay:.1f}s...")
+                    time.sleep(delay)
                 self.connect()
-                if not self.connected:
-                    time.sleep(5)  # Wait before trying to reconnect
-                    continue
+                continue
 
             try:
-                response = self.socket.recv(2048).decode('utf-8')
-                if not response:
-                    print("Empty response received. Reconnecting...")
-                    self.connected = False
-                    continue
-
-                if response.startswith('PING'):
-                    self.socket.send("PONG\n".encode('utf-8'))
-
-                elif len(response) > 0:
-                    username_match = re.search(r":(\w+)!", response)
-                    message_match = re.search(r"PRIVMSG.*:(.+)", response)
-                    if username_match and message_match:
-                        username = username_match.group(1)
-                        message = message_match.group(1).strip()
-                        self.handle_message(username, message)
-
-            except Exception as e:
-                print(f"Error in main loop: {e}")
-                self.connected = False
+                data = self.socket.recv(4096)
+            except socket.timeout:
+                self.check_keepalive()
+                continue
+            except OSError as e:
+                self.disconnect(f"receive failed: {e}")
+                continue
+            if not data:
+                self.disconnect("connection closed by server")
+                continue
+
+            # One chunk can carry many lines (raids) or end mid-line
+            received = time.perf_counter()
+            for irc_message in self.irc_buffer.feed_messages(data):
+                if not self.connected:
+                    break
+                try:
+                    self.handle_irc_message(irc_message)
+                except Exception as e:
+                    # A bad message or handler bug costs that message, not the connection
+                    print(f"Error handling IRC message: {e}")
+                IRC_HANDLE_SECONDS.observe(time.perf_counter() - received, irc_message.command)
+            self.check_keepalive()
+
+    def warm_up(self):
+        # Decode sounds once the bot has joined, so neither connecting nor the
+        # first phase change waits on the audio mixer
+        self.connection.ready.wait()
+        for sink in {channel.task_manager.sound_sink for channel in self.channels.values()}:
+            audio_worker.preload(sink)
+
+    def check_keepalive(self):
+        action = self.connection.keepalive()
+        if action == 'ping':
+            try:
+                self.send_raw("PING :tmi.twitch.tv")
+            except OSError as e:
+                self.disconnect(f"send failed: {e}")
+        elif action == 'timeout':
+            self.disconnect("no PONG from server")
+
+    def handle_irc_message(self, irc_message):
+        if self.connection.observe(irc_message):
+            # Twitch is about to restart this server; reconnect right away rather than wait for the drop
+            self.disconnect("server requested reconnect", retry_now=True)
+        elif irc_message.command == 'PING':
+            self.send_raw(f"PONG :{irc_message.trailing}")
+        elif irc_message.command == 'PRIVMSG':
+            channel = self.channels.get(irc_message.channel.lower())
+            if channel is not None:
+                self.handle_message(irc_message.nick, irc_message.trailing.strip(), channel)
+        elif irc_message.command == 'USERSTATE':
+            channel = self.channels.get(irc_message.channel.lower())
+            if channel is None:
+                return
+            # Moderators and the broadcaster get a much higher chat rate limit. The
+            # send queue is shared, so it only uses it once the bot is a mod everywhere.
+            badges = irc_message.tags.get('badges', '')
+            channel.moderator = (irc_message.tags.get('mod') == '1'
+                                 or 'broadcaster/' in badges or 'moderator/' in badges)
+            self.send_queue.set_moderator(all(channel.moderator for channel in self.channels.values()))
+
+    def shutdown(self):
+        # Fold the journal into the snapshot and close connections on exit
+        dashboard = self.task_manager.dashboard
+        if dashboard is not None:
+            dashboard.stop()
+        print("Shutting down...")
+        for channel in self.channels.values():
+            channel.shutdown()
+        self.close_socket()
 
     def daily_maintenance(self):
         while True:
-            now = datetime.now()
             # Wait until the next day
-            tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
-            time_to_wait = (tomorrow - now).total_seconds()
-            time.sleep(time_to_wait)
-
-            # Perform daily maintenance
-            self.task_manager.clean_old_tasks()
-            self.task_manager.reset_daily_stats()
-            self.lurkers.clear()  # Clear the lurkers set at the start of a new day
-
-    def handle_message(self, username, message):
-        # Check if the user is blocked (except for admin)
-        if username.lower() != self.admin_user.lower() and self.task_manager.is_user_blocked(username):
-            return  # Silently ignore messages from blocked users
-
-        if message == '!hi':
-            self.send_message('hello')
-        elif message == '!lurk':
-            self.lurkers.add(username)
-            self.send_message(f"thanks for lurking {username}!")
-        elif message == '!lurkers':
-            if self.lurkers:
-                lurker_list = ", ".join(self.lurkers)
-                self.send_message(f"current lurkers: {lurker_list}")
-            else:
-                self.send_message("no one is currently lurking.")
-        elif message.startswith('!block'):
-            if username != self.admin_user:
-                self.send_message(f"@{username} sorry, only the admin can use this command.")
-                return
-            parts = message.split(maxsplit=1)
-            if len(parts) == 2:
-                user_to_block = parts[1].lower()
-                if self.task_manager.block_user(user_to_block):
-                    self.send_message(f"@{username} user {user_to_block} has been blocked from using bot commands.")
-                else:
-                    self.send_message(f"@{username} user {user_to_block} is already blocked.")
-            else:
-                self.send_message(f"@{username} Usage: !block <username>")
-        elif message.startswith('!unblock'):
-            if username != self.admin_user:
-                self.send_message(f"@{username} Sorry, only the admin can use this command.")
-                return
-            parts = message.split(maxsplit=1)
-            if len(parts) == 2:
-                user_to_unblock = parts[1].lower()
-                if self.task_manager.unblock_user(user_to_unblock):
-                    self.send_message(f"@{username} User {user_to_unblock} has been unblocked and can use bot commands again.")
-                else:
-                    self.send_message(f"@{username} User {user_to_unblock} is not blocked.")
-            else:
-                self.send_message(f"@{username} Usage: !unblock <username>")
-        elif message.startswith('!task'):
-            parts = message.split(maxsplit=2)
-            if len(parts) == 1:
-                # User just typed !task, show help message
-                help_message = ("Task commands: !task add <description> | !task remove <id> | "
-                                "!task complete <id> | !task list | !task stats")
-                self.send_message(f"@{username} {help_message}")
-                return  # Add return here to prevent further processing
-            
-            command = parts[1]
-            if command == 'add':
-                if len(parts) == 3:
-                    task_id = self.task_manager.add_task(parts[2], username)
-                    self.send_message(f"@{username} Task added with ID: {task_id}")
-                else:
-                    self.send_message(f"@{username} Please provide a task description.")
-            elif command == 'remove':
-                if len(parts) == 3:
-                    if self.task_manager.remove_task(parts[2], username):
-                        self.send_message(f"@{username} Task {parts[2]} removed")
-                    else:
-                        self.send_message(f"@{username} Task {parts[2]} not found or not assigned to you")
-                else:
-                    self.send_message(f"@{username} Please provide a task ID to remove.")
-            elif command == 'complete':
-                if len(parts) == 3:
-                    if self.task_manager.complete_task(parts[2], username):
-                        self.send_message(f"@{username} Task {parts[2]} marked as complete")
-                    else:
-                        self.send_message(f"@{username} Task {parts[2]} not found or not assigned to you")
-                else:
-                    self.send_message(f"@{username} Please provide a task ID to complete.")
-            elif command == 'list':
-                user_tasks = self.task_manager.get_user_tasks(username)
-                task_list = self.task_manager.format_task_list(user_tasks)
-                self.send_message(f"@{username} Your incomplete tasks: {task_list}")
-            elif command == 'stats':
-                stats = self.task_manager.get_user_stats(username)
-                self.send_message(f"@{username} Your stats - Daily completed: {stats['daily']}, Total completed: {stats['total']}")
-            elif command == 'wipe':
-                if username == self.admin_user:
-                    if len(parts) == 3:
-                        user_to_wipe = parts[2]
-                        wiped_count = self.task_manager.wipe_user_tasks(user_to_wipe)
-                        self.send_message(f"@{username} Wiped {wiped_count} tasks for user {user_to_wipe}")
-                    else:
-                        self.send_message(f"@{username} Please provide a username to wipe tasks for.")
-                else:
-                    self.send_message(f"@{username} You don't have permission to use this command.")
-            else:
-                self.send_message(f"@{username} Invalid task command. Type !task for help.")
-        elif message.startswith('!timer'):
-            if username != self.admin_user:
-                self.send_message(f"@{username} Sorry, only the admin can use timer commands.")
-                return
+            time.sleep(seconds_until_midnight())
+            self.run_daily_maintenance()
 
-            parts = message.split()
-            if len(parts) == 1:
-                # User just typed !timer, show help message
-                help_message = ("Timer commands: !timer start | !timer stop | !timer pause | "
-                                "!timer resume | !timer set <type> <minutes>")
-                self.send_message(f"@{username} {help_message}")
-            elif len(parts) >= 2:
-                command = parts[1]
-                if command == 'start':
-                    self.task_manager.start_timer()
-                    timer_type = self.task_manager.current_phase
-                    duration = self.task_manager.get_duration()
-                    self.send_message(f"@{username} {timer_type.capitalize()} timer started for {duration} minutes!")
-                elif command == 'stop':
-                    self.task_manager.stop_timer()
-                    self.send_message(f"@{username} Timer stopped.")
-                elif command == 'pause':
-                    self.task_manager.pause_timer()
-                    self.send_message(f"@{username} Timer paused.")
-                elif command == 'resume':
-                    self.task_manager.resume_timer()
-                    self.send_message(f"@{username} Timer resumed.")
-                elif command == 'set' and len(parts) == 4:
-                    timer_type = parts[2]
-                    try:
-                        duration = int(parts[3])
-                        if timer_type in ['focus', 'short', 'long']:
-                            self.task_manager.set_timer_duration(timer_type, duration)
-                            self.send_message(f"@{username} {timer_type.capitalize()} timer set to {duration} minutes.")
-                        else:
-                            self.send_message(f"@{username} Invalid timer type. Use 'focus', 'short', or 'long'.")
-                    except ValueError:
-                        self.send_message(f"@{username} Invalid duration. Please use a number of minutes.")
-                else:
-                    self.send_message(f"@{username} Invalid timer command. Type !timer for help.")
-        elif message.startswith('!volume'):
-            if username != self.admin_user:
-                self.send_message(f"@{username} Sorry, only the admin can change the volume.")
-                return
+    def run_daily_maintenance(self):
+        for channel in self.channels.values():
+            channel.run_daily_maintenance()
+
+    def handle_message(self, username, message, channel=None):
+        # Ordinary chat stops at the router's first-character check
+        self.commands.dispatch(channel or self.default_channel, username, message)
 
-            parts = message.split()
-            if len(parts) == 1:
-                # User just typed !volume, show current volume
-                current_volume = self.task_manager.get_volume()
-                self.send_message(f"@{username} Current volume is set to {current_volume}%")
-            elif len(parts) == 2:
-                try:
-                    new_volume = int(parts[1])
-                    if 0 <= new_volume <= 100:
-                        self.task_manager.set_volume(new_volume / 100)
-                        self.send_message(f"@{username} Volume set to {new_volume}%")
-                    else:
-                        self.send_message(f"@{username} Volume must be between 0 and 100")
-                except ValueError:
-                    self.send_message(f"@{username} Invalid volume. Please use a number between 0 and 100")
-            else:
-                self.send_message(f"@{username} Usage: !volume or !volume <0-100>")
-        else:
-            # Handle other commands or messages
-            pass  # Add this line to handle the case when no specific command is matched
-
-    def on_phase_change(self, phase):
-        phase_messages = {
-            'focus': "-----> FOCUS TIME <-----",
-            'short_break': "-----> SHORT BREAK <-----",
-            'long_break': "-----> LONG BREAK <-----"
-        }
-        message = phase_messages.get(phase, "")
-        if message:
-            self.send_message(message)
-            
 if __name__ == "__main__":
     # 1) Instantiate the bot first, so get_timer_data() can see it
     bot = TwitchBot()
 
-    # 2) Start Flask in a separate daemon thread
-    flask_thread = Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-    print("Flask server running on http://localhost:5000/timer and /status")
+    # 2) Start the overlay HTTP server: the pooled production server by default,
+    #    or Flask's development server with HTTP_SERVER=dev
+    http_port = int(os.getenv('HTTP_PORT', '5000'))
+    overlay_server = None
+    if os.getenv('HTTP_SERVER', 'production') == 'dev':
+        flask_thread = Thread(target=run_flask, args=(http_port,), daemon=True)
+        flask_thread.start()
+    else:
+        overlay_server = http_server.serve(
+            app, port=http_port,
+            threads=int(os.getenv('HTTP_THREADS', http_server.DEFAULT_THREADS)),
+            timeout=int(os.getenv('HTTP_TIMEOUT', http_server.DEFAULT_TIMEOUT)),
+            max_streams=int(os.getenv('HTTP_MAX_STREAMS', http_server.DEFAULT_MAX_STREAMS))
+        )
+    print(f"Overlay server running on http://localhost:{http_port}/timer and /status")
+
+    # SIGTERM (e.g. from a process manager) shuts down the same way as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
     # 3) Now launch the Twitch bot’s main loop
-    bot.run()
+    try:
+        bot.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if overlay_server:
+            overlay_server.graceful_shutdown()
+        bot.shutdown()
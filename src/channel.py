@@ -0,0 +1,59 @@
+import os
+
+from overlay_cache import CachedJSON
+from send_queue import PRIORITY_HIGH, PRIORITY_NORMAL
+from task_manager import TaskManager
+
+PHASE_MESSAGES = {
+    'focus': "-----> FOCUS TIME <-----",
+    'short_break': "-----> SHORT BREAK <-----",
+    'long_break': "-----> LONG BREAK <-----"
+}
+
+
+def channel_data_path(name, data_dir=None):
+    # One channel keeps the original twitch_tasks.json in the working directory;
+    # with several, each gets <data_dir>/<channel>/ for its tasks, timer.cfg and blocked users
+    if data_dir is None:
+        return 'twitch_tasks.json'
+    directory = os.path.join(data_dir, name)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, 'twitch_tasks.json')
+
+
+class Channel:
+    """
+    One joined channel: its own TaskManager (tasks, timer, blocked users),
+    lurkers and overlay caches, sharing the bot's connection, send queue,
+    command router and timer scheduler. Command handlers receive the
+    Channel as their `bot`, so replies and state stay within the channel.
+    """
+
+    def __init__(self, bot, name, file_path, storage='json', sound='host'):
+        self.bot = bot
+        self.name = name
+        self.admin_user = bot.admin_user
+        self.lurkers = set()
+        self.moderator = False
+        self.task_manager = TaskManager(file_path, self.on_phase_change, storage=storage, sound=sound)
+        self.status_view = CachedJSON(self.task_manager.timer_snapshot)
+        self.tasks_file_view = CachedJSON(self.task_manager.snapshot_data)
+        self.overlay_view = CachedJSON(self.task_manager.overlay_view)
+
+    def send_message(self, message, priority=PRIORITY_NORMAL):
+        # Queued; the bot's send loop delivers it within Twitch's rate limits
+        self.bot.send_queue.put(self.name, message, priority)
+
+    def on_phase_change(self, phase):
+        message = PHASE_MESSAGES.get(phase, "")
+        if message:
+            self.send_message(message, PRIORITY_HIGH)
+
+    def run_daily_maintenance(self):
+        self.task_manager.clean_old_tasks()
+        self.task_manager.reset_daily_stats()
+        self.lurkers.clear()  # Clear the lurkers set at the start of a new day
+
+    def shutdown(self):
+        self.task_manager.save_data()
+        self.task_manager.store.close()
@@ -0,0 +1,411 @@
+import importlib
+import time
+
+from metrics import registry
+from throttle import DEFAULT_COOLDOWN, CommandThrottle
+
+ADMIN = 'admin'
+EVERYONE = 'everyone'
+# Entries in the !task top reply
+TOP_SIZE = 5
+
+COMMAND_SECONDS = registry.histogram('twitchbot_command_seconds', "Time spent handling each chat command",
+                                     label='command')
+
+
+class Arg:
+    """
+    One positional argument of a command. `rest` takes the remainder of the
+    line (spaces included); `convert` failures and values outside `choices`
+    reply with `invalid`, a missing required argument with `missing`.
+    """
+    __slots__ = ('name', 'convert', 'rest', 'optional', 'choices', 'missing', 'invalid')
+
+    def __init__(self, name, convert=str, rest=False, optional=False, choices=None, missing=None, invalid=None):
+        self.name = name
+        self.convert = convert
+        self.rest = rest
+        self.optional = optional
+        self.choices = choices
+        self.missing = missing
+        self.invalid = invalid
+
+
+class Command:
+    """
+    A chat command. Either a leaf with a handler called as
+    handler(bot, username, *args), or a table of subcommands keyed on the
+    next token, whose handler (if any) runs when no subcommand is given.
+    """
+
+    def __init__(self, name, handler=None, permission=EVERYONE, args=(), usage=None, denied=None,
+                 subcommands=None, unknown=None, cooldown=DEFAULT_COOLDOWN):
+        self.name = name
+        self.cooldown = cooldown  # per viewer and subcommand, set on top-level commands only
+        self.handler = handler
+        self.permission = permission
+        self.args = args
+        self.usage = usage
+        self.denied = denied or "You don't have permission to use this command."
+        self.subcommands = subcommands
+        self.unknown = unknown
+        if subcommands is not None:
+            self.subcommands = {}
+            for subcommand in subcommands:
+                self.add(subcommand)
+
+    def add(self, subcommand):
+        if self.subcommands is None:
+            self.subcommands = {}
+        self.subcommands[subcommand.name] = subcommand
+        return subcommand
+
+    def throttle_key(self, text):
+        # '!task add' and '!task complete' are separate commands as far as cooldowns go
+        if self.subcommands:
+            parts = text.split(maxsplit=1)
+            if parts and parts[0] in self.subcommands:
+                return f"{self.name} {parts[0]}"
+        return self.name
+
+    def run(self, bot, username, text):
+        if self.permission == ADMIN and not is_admin(bot, username):
+            reply(bot, username, self.denied)
+            return
+
+        if self.subcommands is not None:
+            parts = text.split(maxsplit=1)
+            if not parts:
+                if self.handler:
+                    self.handler(bot, username)
+                return
+            subcommand = self.subcommands.get(parts[0])
+            if subcommand is None:
+                if self.unknown:
+                    reply(bot, username, self.unknown)
+                return
+            subcommand.run(bot, username, parts[1] if len(parts) == 2 else '')
+            return
+
+        args = self.parse_args(bot, username, text)
+        if args is not None:
+            self.handler(bot, username, *args)
+
+    def parse_args(self, bot, username, text):
+        # Returns the converted arguments, or None after replying with an error
+        specs = self.args
+        if specs and specs[-1].rest:
+            tokens = text.split(maxsplit=len(specs) - 1)
+        else:
+            tokens = text.split()
+            # Extra words are an error only for commands with a usage line
+            if len(tokens) > len(specs) and self.usage:
+                reply(bot, username, self.usage)
+                return None
+
+        values = []
+        for index, spec in enumerate(specs):
+            if index >= len(tokens):
+                if spec.optional:
+                    values.append(None)
+                    continue
+                message = spec.missing or self.usage
+                if message:
+                    reply(bot, username, message)
+                return None
+            try:
+                value = spec.convert(tokens[index])
+            except ValueError:
+                value = None
+                valid = False
+            else:
+                valid = spec.choices is None or value in spec.choices
+            if not valid:
+                message = spec.invalid or self.usage
+                if message:
+                    reply(bot, username, message)
+                return None
+            values.append(value)
+        return values
+
+
+class CommandRouter:
+    """
+    Commands keyed on the first token of a chat line. Messages that don't
+    start with '!' are rejected on their first character, before any
+    splitting or blocked-user lookup. Known commands from viewers other
+    than the admin then pass the throttle, which drops excess ones silently.
+    """
+
+    def __init__(self, throttle=None):
+        self.commands = {}
+        self.throttle = throttle
+
+    def register(self, command):
+        self.commands[command.name] = command
+        return command
+
+    def command(self, name, **options):
+        # Decorator form of register, for plugins:
+        #     @router.command('!dice', args=(Arg('sides', int, optional=True),))
+        #     def dice(bot, username, sides): ...
+        def decorator(handler):
+            self.register(Command(name, handler, **options))
+            return handler
+        return decorator
+
+    def subcommand(self, parent, name, **options):
+        # Same, adding to an existing table such as '!task'
+        def decorator(handler):
+            self.commands[parent].add(Command(name, handler, **options))
+            return handler
+        return decorator
+
+    def dispatch(self, bot, username, message):
+        if message[:1] != '!':
+            return False
+        parts = message.split(maxsplit=1)
+        command = self.commands.get(parts[0])
+        if command is None:
+            return False
+        text = parts[1] if len(parts) == 2 else ''
+        # Blocked and throttled users (never the admin) are ignored silently
+        if not is_admin(bot, username, ignore_case=True):
+            if bot.task_manager.is_user_blocked(username):
+                return False
+            if self.throttle and not self.throttle.allow(username, command.throttle_key(text), command.cooldown):
+                return False
+        start = time.perf_counter()
+        command.run(bot, username, text)
+        COMMAND_SECONDS.observe(time.perf_counter() - start, command.name)
+        return True
+
+
+def is_admin(bot, username, ignore_case=False):
+    if ignore_case:
+        return username.lower() == bot.admin_user.lower()
+    return username == bot.admin_user
+
+
+def reply(bot, username, text):
+    bot.send_message(f"@{username} {text}")
+
+
+def load_plugins(router, names):
+    """
+    Import each comma-separated module in `names` (e.g. BOT_PLUGINS) and call
+    its register(router) to add commands.
+    """
+    for name in filter(None, (name.strip() for name in names.split(','))):
+        try:
+            module = importlib.import_module(name)
+            module.register(router)
+            print(f"Loaded plugin {name}")
+        except Exception as e:
+            print(f"Error loading plugin {name}: {e}")
+
+
+# Built-in commands
+
+def say_hi(bot, username):
+    bot.send_message('hello')
+
+
+def lurk(bot, username):
+    bot.lurkers.add(username)
+    bot.send_message(f"thanks for lurking {username}!")
+
+
+def list_lurkers(bot, username):
+    if bot.lurkers:
+        lurker_list = ", ".join(bot.lurkers)
+        bot.send_message(f"current lurkers: {lurker_list}")
+    else:
+        bot.send_message("no one is currently lurking.")
+
+
+def block(bot, username, user_to_block):
+    user_to_block = user_to_block.lower()
+    if bot.task_manager.block_user(user_to_block):
+        reply(bot, username, f"user {user_to_block} has been blocked from using bot commands.")
+    else:
+        reply(bot, username, f"user {user_to_block} is already blocked.")
+
+
+def unblock(bot, username, user_to_unblock):
+    user_to_unblock = user_to_unblock.lower()
+    if bot.task_manager.unblock_user(user_to_unblock):
+        reply(bot, username, f"User {user_to_unblock} has been unblocked and can use bot commands again.")
+    else:
+        reply(bot, username, f"User {user_to_unblock} is not blocked.")
+
+
+def task_help(bot, username):
+    reply(bot, username, "Task commands: !task add <description> | !task remove <id> | "
+                         "!task complete <id> | !task list | !task stats | !task history | "
+                         "!task top [today|all] | !task rank")
+
+
+def task_add(bot, username, description):
+    task_id = bot.task_manager.add_task(description, username)
+    reply(bot, username, f"Task added with ID: {task_id}")
+
+
+def task_remove(bot, username, task_id):
+    if bot.task_manager.remove_task(task_id, username):
+        reply(bot, username, f"Task {task_id} removed")
+    else:
+        reply(bot, username, f"Task {task_id} not found or not assigned to you")
+
+
+def task_complete(bot, username, task_id):
+    if bot.task_manager.complete_task(task_id, username):
+        reply(bot, username, f"Task {task_id} marked as complete")
+    else:
+        reply(bot, username, f"Task {task_id} not found or not assigned to you")
+
+
+def task_list(bot, username):
+    user_tasks = bot.task_manager.get_user_tasks(username)
+    task_list = bot.task_manager.format_task_list(user_tasks)
+    reply(bot, username, f"Your incomplete tasks: {task_list}")
+
+
+def task_stats(bot, username):
+    stats = bot.task_manager.get_user_stats(username)
+    reply(bot, username, f"Your stats - Daily completed: {stats['daily']}, Total completed: {stats['total']}")
+
+
+def task_history(bot, username):
+    history = bot.task_manager.get_user_history(username)
+    reply(bot, username, f"Your history - This week: {history['week']}, This month: {history['month']}, "
+                         f"All time: {history['completed']}, Streak: {history['streak']} days "
+                         f"(best {history['best_streak']})")
+
+
+def task_top(bot, username, board):
+    board = 'total' if board == 'all' else 'daily'
+    standings = bot.task_manager.leaderboard.top(board, TOP_SIZE)
+    label = "All-time" if board == 'total' else "Today's"
+    if not standings:
+        reply(bot, username, f"{label} leaderboard is empty.")
+        return
+    entries = ", ".join(f"{rank}. {user} ({score})" for rank, user, score in standings)
+    reply(bot, username, f"{label} top tasks: {entries}")
+
+
+def task_rank(bot, username):
+    leaderboard = bot.task_manager.leaderboard
+    parts = []
+    for board, label in (('daily', "today"), ('total', "all-time")):
+        standing = leaderboard.rank(board, username)
+        if standing is None:
+            parts.append(f"unranked {label}")
+        else:
+            rank, score = standing
+            parts.append(f"#{rank} {label} ({score} completed)")
+    reply(bot, username, f"Your rank: {', '.join(parts)}")
+
+
+def task_wipe(bot, username, user_to_wipe):
+    wiped_count = bot.task_manager.wipe_user_tasks(user_to_wipe)
+    reply(bot, username, f"Wiped {wiped_count} tasks for user {user_to_wipe}")
+
+
+def timer_help(bot, username):
+    reply(bot, username, "Timer commands: !timer start | !timer stop | !timer pause | "
+                         "!timer resume | !timer set <type> <minutes>")
+
+
+def timer_start(bot, username):
+    bot.task_manager.start_timer()
+    timer_type = bot.task_manager.current_phase
+    duration = bot.task_manager.get_duration()
+    reply(bot, username, f"{timer_type.capitalize()} timer started for {duration} minutes!")
+
+
+def timer_stop(bot, username):
+    bot.task_manager.stop_timer()
+    reply(bot, username, "Timer stopped.")
+
+
+def timer_pause(bot, username):
+    bot.task_manager.pause_timer()
+    reply(bot, username, "Timer paused.")
+
+
+def timer_resume(bot, username):
+    bot.task_manager.resume_timer()
+    reply(bot, username, "Timer resumed.")
+
+
+def timer_set(bot, username, timer_type, duration):
+    bot.task_manager.set_timer_duration(timer_type, duration)
+    reply(bot, username, f"{timer_type.capitalize()} timer set to {duration} minutes.")
+
+
+def volume(bot, username, new_volume):
+    if new_volume is None:
+        current_volume = bot.task_manager.get_volume()
+        reply(bot, username, f"Current volume is set to {current_volume}%")
+    elif 0 <= new_volume <= 100:
+        bot.task_manager.set_volume(new_volume / 100)
+        reply(bot, username, f"Volume set to {new_volume}%")
+    else:
+        reply(bot, username, "Volume must be between 0 and 100")
+
+
+def builtin_commands():
+    invalid_timer = "Invalid timer command. Type !timer for help."
+    return [
+        Command('!hi', say_hi, cooldown=10),
+        Command('!lurk', lurk, cooldown=10),
+        Command('!lurkers', list_lurkers, cooldown=30),
+        Command('!block', block, ADMIN, args=(Arg('username', rest=True),),
+                usage="Usage: !block <username>",
+                denied="sorry, only the admin can use this command."),
+        Command('!unblock', unblock, ADMIN, args=(Arg('username', rest=True),),
+                usage="Usage: !unblock <username>",
+                denied="Sorry, only the admin can use this command."),
+        Command('!task', task_help, unknown="Invalid task command. Type !task for help.", subcommands=[
+            Command('add', task_add, args=(
+                Arg('description', rest=True, missing="Please provide a task description."),)),
+            Command('remove', task_remove, args=(
+                Arg('task_id', rest=True, missing="Please provide a task ID to remove."),)),
+            Command('complete', task_complete, args=(
+                Arg('task_id', rest=True, missing="Please provide a task ID to complete."),)),
+            Command('list', task_list),
+            Command('stats', task_stats),
+            Command('history', task_history),
+            Command('top', task_top, args=(
+                Arg('board', optional=True, choices=('today', 'all'),
+                    invalid="Usage: !task top or !task top all"),)),
+            Command('rank', task_rank),
+            Command('wipe', task_wipe, ADMIN, args=(
+                Arg('username', rest=True, missing="Please provide a username to wipe tasks for."),)),
+        ]),
+        Command('!timer', timer_help, ADMIN, unknown=invalid_timer,
+                denied="Sorry, only the admin can use timer commands.", subcommands=[
+            Command('start', timer_start),
+            Command('stop', timer_stop),
+            Command('pause', timer_pause),
+            Command('resume', timer_resume),
+            Command('set', timer_set, usage=invalid_timer, args=(
+                Arg('type', choices=('focus', 'short', 'long'),
+                    invalid="Invalid timer type. Use 'focus', 'short', or 'long'."),
+                Arg('minutes', int, invalid="Invalid duration. Please use a number of minutes."),
+            )),
+        ]),
+        Command('!volume', volume, ADMIN, usage="Usage: !volume or !volume <0-100>",
+                denied="Sorry, only the admin can change the volume.", args=(
+            Arg('volume', int, optional=True,
+                invalid="Invalid volume. Please use a number between 0 and 100"),
+        )),
+    ]
+
+
+def create_router():
+    router = CommandRouter(CommandThrottle())
+    for command in builtin_commands():
+        router.register(command)
+    return router
@@ -0,0 +1,199 @@
+import random
+import threading
+import time
+from collections import deque
+
+# Reconnect delays grow from BACKOFF_INITIAL to BACKOFF_MAX seconds, with jitter
+BACKOFF_INITIAL = 1
+BACKOFF_MAX = 60
+# A connection that stayed up this long resets the backoff when it drops
+STABLE_AFTER = 60
+CONNECT_TIMEOUT = 10
+# Send our own PING after this long without hearing from the server, and
+# give up on the connection if the PONG takes longer than PING_TIMEOUT
+PING_INTERVAL = 60
+PING_TIMEOUT = 10
+# Stop waiting for JOIN confirmations this long after the welcome, and send anyway
+JOIN_TIMEOUT = 10
+
+
+class Backoff:
+    """
+    Exponential backoff with "equal jitter": the delay is half the current
+    step plus a random share of the other half, so a fleet of bots dropped
+    at once doesn't reconnect in lockstep, yet never retries instantly.
+    """
+
+    def __init__(self, initial=BACKOFF_INITIAL, maximum=BACKOFF_MAX):
+        self.initial = initial
+        self.maximum = maximum
+        self.attempt = 0
+
+    def next_delay(self):
+        step = min(self.maximum, self.initial * 2 ** self.attempt)
+        self.attempt += 1
+        return step / 2 + random.uniform(0, step / 2)
+
+    def reset(self):
+        self.attempt = 0
+
+
+class ConnectionManager:
+    """
+    Connection lifecycle shared by the threaded and asyncio bots, which do
+    the actual socket I/O: when to retry, keepalive PINGs, RECONNECT
+    notices, when the bot has rejoined (the `ready` event, which gates the
+    outbound queue so messages queued during an outage are replayed only
+    once they can be delivered), and reconnect latency.
+    """
+
+    def __init__(self, nick, channels):
+        self.nick = (nick or '').lower()
+        self.channels = set(channels)
+        self.backoff = Backoff()
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.connected = False
+        self.joined = set()
+        self.connected_at = None
+        self.welcomed_at = None
+        self.ready_at = None
+        self.disconnected_at = None
+        self.last_received = time.monotonic()
+        self.ping_sent_at = None
+        self.retry_now = True  # the first attempt goes out immediately
+        self.ever_ready = False
+        self.on_ready = None  # optional callback, e.g. to wake an asyncio send loop
+
+        self.connects = 0
+        self.disconnects = 0
+        self.reconnects = 0
+        self.pings_sent = 0
+        self.ping_timeouts = 0
+        self.reconnect_notices = 0
+        self.last_disconnect_reason = None
+        self.reconnect_latencies = deque(maxlen=100)  # seconds, outage start to rejoined
+
+    def next_delay(self):
+        # Seconds to wait before the next connection attempt
+        with self.lock:
+            if self.retry_now:
+                self.retry_now = False
+                return 0
+            return self.backoff.next_delay()
+
+    def connection_opened(self):
+        with self.lock:
+            now = time.monotonic()
+            self.connected = True
+            self.connects += 1
+            self.connected_at = now
+            self.welcomed_at = None
+            self.last_received = now
+            self.ping_sent_at = None
+            self.joined = set()
+
+    def connection_lost(self, reason, retry_now=False):
+        # Returns False if the connection was already marked lost, so only the first caller logs it
+        with self.lock:
+            if not self.connected:
+                return False
+            now = time.monotonic()
+            self.connected = False
+            self.ready.clear()
+            self.disconnects += 1
+            self.last_disconnect_reason = reason
+            if self.disconnected_at is None:
+                self.disconnected_at = now
+            if self.ready_at is not None and now - self.ready_at >= STABLE_AFTER:
+                self.backoff.reset()
+            self.ready_at = None
+            self.retry_now = retry_now
+            return True
+
+    def connect_failed(self, reason):
+        with self.lock:
+            self.last_disconnect_reason = reason
+            # Failures before the first successful join aren't an outage of a working bot
+            if self.ever_ready and self.disconnected_at is None:
+                self.disconnected_at = time.monotonic()
+
+    def observe(self, message):
+        """
+        Feed every received message through here. Returns True when the
+        server asked us to reconnect (RECONNECT).
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.last_received = now
+            command = message.command
+            if command == 'PONG':
+                self.ping_sent_at = None
+            elif command == '001':
+                self.welcomed_at = now
+            elif command == 'JOIN' and message.nick.lower() == self.nick:
+                self.joined.add(message.channel.lower())
+                if self.channels <= self.joined:
+                    self.mark_ready(now)
+            elif command == 'RECONNECT':
+                self.reconnect_notices += 1
+                return True
+        return False
+
+    def mark_ready(self, now):
+        # Called with the lock held
+        if self.ready.is_set():
+            return
+        if self.disconnected_at is not None:
+            if self.ever_ready:
+                self.reconnects += 1
+            self.reconnect_latencies.append(now - self.disconnected_at)
+            self.disconnected_at = None
+        self.ready_at = now
+        self.ever_ready = True
+        self.ready.set()
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def keepalive(self):
+        """
+        Call periodically while connected. Returns 'ping' when a PING should
+        be sent, 'timeout' when the connection is dead, or None.
+        """
+        with self.lock:
+            if not self.connected:
+                return None
+            now = time.monotonic()
+            if self.welcomed_at is not None and now - self.welcomed_at >= JOIN_TIMEOUT:
+                self.mark_ready(now)
+            if self.ping_sent_at is not None:
+                if now - self.ping_sent_at >= PING_TIMEOUT:
+                    self.ping_timeouts += 1
+                    return 'timeout'
+                return None
+            if now - self.last_received >= PING_INTERVAL:
+                self.ping_sent_at = now
+                self.pings_sent += 1
+                return 'ping'
+            return None
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.reconnect_latencies)
+            now = time.monotonic()
+            return {
+                "connected": self.connected,
+                "ready": self.ready.is_set(),
+                "uptime_seconds": round(now - self.ready_at, 1) if self.ready_at is not None else 0,
+                "outage_seconds": round(now - self.disconnected_at, 1) if self.disconnected_at is not None else 0,
+                "connects": self.connects,
+                "disconnects": self.disconnects,
+                "reconnects": self.reconnects,
+                "reconnect_notices": self.reconnect_notices,
+                "pings_sent": self.pings_sent,
+                "ping_timeouts": self.ping_timeouts,
+                "last_disconnect_reason": self.last_disconnect_reason,
+                "reconnect_latency_last_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+                "reconnect_latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                "reconnect_latency_max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+            }
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+
+from rich.align import Align
+from rich.layout import Layout
+from rich.live import Live
+from rich.padding import Padding
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+from metrics import registry
+
+# Users shown in the stats panel
+STATS_ROWS = 20
+
+FRAME_SECONDS = registry.histogram('twitchbot_dashboard_frame_seconds', "Time to rebuild one console dashboard frame")
+
+
+class Dashboard:
+    """
+    Console dashboard drawn with rich.live.Live instead of clear-and-reprint.
+
+    The layout is built once; each tick only rebuilds the regions whose
+    inputs changed: the timer header every second, the stats and task
+    tables only after a TaskManager mutation, and the footer never.
+    """
+
+    def __init__(self, task_manager, console):
+        self.tm = task_manager
+        self.console = console
+        self.layout = self.build_layout()
+        self.region_keys = {}
+        self.live = None
+        self.lock = threading.Lock()  # the dashboard thread ticks, shutdown stops
+        self.stopped = False
+        self.last_build_ms = 0.0
+        self.build_times = deque(maxlen=60)  # ms, last minute of frames
+
+    def build_layout(self):
+        layout = Layout()
+        layout.split_column(
+            Layout(name="top_padding", size=1),
+            Layout(name="main_content")
+        )
+        layout["main_content"].split_column(
+            Layout(name="header", size=14),
+            Layout(name="body"),
+            Layout(name="footer", size=7)
+        )
+        layout["main_content"]["body"].split_row(
+            Layout(name="stats", ratio=3),
+            Layout(name="tasks", ratio=7)
+        )
+
+        # Top padding (empty)
+        layout["top_padding"].update("")
+        layout["main_content"]["footer"].update(self.build_footer())
+        return layout
+
+    def start(self):
+        # Alternate screen, redrawn in place: no clear, no flicker
+        self.live = Live(self.layout, console=self.console, screen=True, auto_refresh=False)
+        self.live.start()
+
+    def stop(self):
+        # Called on bot shutdown: restores the normal screen and cursor, and no later tick redraws
+        with self.lock:
+            self.stopped = True
+            if self.live:
+                self.live.stop()
+                self.live = None
+
+    def tick(self):
+        with self.lock:
+            if self.stopped:
+                return
+            if self.live is None:
+                self.start()
+            changed = self.update()
+            if changed:
+                self.live.refresh()
+
+    def update(self):
+        """
+        Rebuild the regions whose data changed since the last frame.
+        Returns the names of the rebuilt regions.
+        """
+        start = time.perf_counter()
+        tm = self.tm
+        changed = []
+
+        # The timer key includes the displayed second, so this region rebuilds once per second
+        self.refresh_region("header", (tm.state_version, tm.remaining_seconds()), self.build_header, changed)
+        # Completed counters only move on complete_task and the daily reset
+        self.refresh_region("stats", (tm.completed_today, tm.completed_total, len(tm.user_stats)),
+                            self.build_stats, changed)
+        self.refresh_region("tasks", (tm.state_version,), self.build_tasks, changed)
+
+        elapsed = time.perf_counter() - start
+        FRAME_SECONDS.observe(elapsed)
+        self.last_build_ms = elapsed * 1000
+        self.build_times.append(self.last_build_ms)
+        return changed
+
+    def refresh_region(self, name, key, build, changed):
+        if self.region_keys.get(name) == key:
+            return
+        self.region_keys[name] = key
+        self.layout[name].update(build())
+        changed.append(name)
+
+    def average_build_ms(self):
+        if not self.build_times:
+            return 0.0
+        return sum(self.build_times) / len(self.build_times)
+
+    def build_header(self):
+        timer_status = self.tm.get_timer_status()
+        return Panel(
+            timer_status,
+            title="🍅 Pomodoro 🍅",
+            subtitle=f"frame {self.average_build_ms():.1f} ms",
+            subtitle_align="right",
+            border_style="bold",
+            padding=(0, 1),
+            expand=True,
+            title_align="center"
+        )
+
+    def build_stats(self):
+        stats_table = Table(show_header=True, header_style="bold magenta", show_lines=False, box=None, padding=(0, 1))
+        stats_table.add_column("User", style="dim", width=22)  # Increased width
+        stats_table.add_column("Today", justify="right", width=12)  # Increased width
+        stats_table.add_column("All-time", justify="right", width=12)  # Increased width
+
+        # Ranked by all-time completions; only the rows that fit are read from the leaderboard
+        for rank, user, total in self.tm.leaderboard.top('total', STATS_ROWS):
+            stats_table.add_row(f"{rank}. {user}", str(self.tm.get_user_stats(user)['daily']), str(total))
+
+        return Panel(
+            stats_table,
+            title="Tasks Completed",  # Changed from "User Stats" to "Tasks Completed"
+            subtitle=f"Total tasks completed (All-time): {self.tm.completed_total}",
+            border_style="bold green"
+        )
+
+    def build_tasks(self):
+        tasks_table = Table(show_header=True, header_style="bold cyan", show_lines=False, box=None, padding=(0, 1))
+        tasks_table.add_column("ID", style="bright_yellow", width=10)
+        tasks_table.add_column("Description", style="bright_white", width=60, no_wrap=True)
+        tasks_table.add_column("User", style="bright_blue", width=20)
+
+        for task_id, task in self.tm.get_open_tasks().items():
+            # Truncate description if it's too long
+            description = task.description[:57] + "..." if len(task.description) > 60 else task.description
+            tasks_table.add_row(
+                task_id,
+                description,
+                task.user
+            )
+
+        return Panel(
+            tasks_table,
+            title="Today's Open Tasks",  # Changed from "Today's Incomplete Tasks" to "Today's Open Tasks"
+            border_style="bold cyan",
+            title_align="center"
+        )
+
+    def build_footer(self):
+        footer_lines = [
+            " Keep up the great work! ",
+            "",  # This adds a blank line
+            "📝 Use !task command to manage your tasks 📝"
+        ]
+        footer_text = Text("\n".join(footer_lines), justify="center")
+        footer_text.stylize("bold green", 0, len(footer_lines[0]))
+        footer_text.stylize("italic cyan", len(footer_lines[0]) + len(footer_lines[1]) + 2, len(footer_text))
+
+        # Add padding to move text down and center it horizontally
+        padded_footer = Align.center(
+            Padding(footer_text, (1, 0, 0, 0)),  # 1 line padding at the top
+            vertical="middle"
+        )
+
+        return Panel(
+            padded_footer,
+            border_style="bold",
+            expand=True
+        )
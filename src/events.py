@@ -0,0 +1,79 @@
+import json
+import threading
+from collections import deque
+
+# Events a slow overlay may fall behind by before it is sent a fresh snapshot
+MAX_PENDING_EVENTS = 256
+KEEPALIVE_INTERVAL = 15
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class EventHub:
+    """
+    Fan-out of TaskManager changes (task deltas, timer state) to overlay
+    connections. Callbacks run on the publishing thread and must not block.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.next_token = 0
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.next_token += 1
+            self.subscribers[self.next_token] = callback
+            return self.next_token
+
+    def unsubscribe(self, token):
+        with self.lock:
+            self.subscribers.pop(token, None)
+
+    def publish(self, event, data):
+        with self.lock:
+            callbacks = list(self.subscribers.values())
+        for callback in callbacks:
+            callback(event, data)
+
+
+class Subscription:
+    """
+    Blocking, bounded event buffer for one streaming HTTP response on a
+    server thread. If the client stops reading, the backlog is dropped and
+    the next get() asks for a resync instead of growing without bound.
+    """
+
+    def __init__(self, hub, max_pending=MAX_PENDING_EVENTS):
+        self.hub = hub
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.overflowed = False
+        self.cond = threading.Condition()
+        self.token = hub.subscribe(self.push)
+
+    def push(self, event, data):
+        with self.cond:
+            if len(self.pending) >= self.max_pending:
+                self.pending.clear()
+                self.overflowed = True
+            else:
+                self.pending.append((event, data))
+            self.cond.notify()
+
+    def get(self, timeout=KEEPALIVE_INTERVAL):
+        # Returns (event, data), ('resync', None) after an overflow, or None on timeout
+        with self.cond:
+            if not self.pending and not self.overflowed:
+                self.cond.wait(timeout)
+            if self.overflowed:
+                self.overflowed = False
+                return 'resync', None
+            if self.pending:
+                return self.pending.popleft()
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self.token)
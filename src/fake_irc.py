@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+
+from irc import LineBuffer, parse_line
+
+SERVER_NAME = 'tmi.twitch.tv'
+
+
+class FakeIRCServer:
+    """
+    Minimal stand-in for irc.chat.twitch.tv, for running the bot locally.
+    Accepts any PASS/NICK, echoes JOINs and lets the caller inject chat.
+    Point the bot at it with TWITCH_IRC_HOST / TWITCH_IRC_PORT.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.clients = {}  # writer -> nick
+        self.joined = {}  # writer -> set of channel names (no '#')
+        self.received = []  # every line sent by any client
+        self.line_received = asyncio.Event()
+        self.answer_pings = True  # False simulates a connection that silently died
+        self.on_line = None  # optional callback(line), called as each client line arrives
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        for writer in list(self.clients):
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        self.clients[writer] = ''
+        buffer = LineBuffer()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                for line in buffer.feed(data):
+                    self.received.append(line)
+                    self.line_received.set()
+                    if self.on_line is not None:
+                        self.on_line(line)
+                    self.reply(writer, line)
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            self.joined.pop(writer, None)
+            writer.close()
+
+    def reply(self, writer, line):
+        message = parse_line(line)
+        if message is None:
+            return
+        if message.command == 'NICK':
+            self.clients[writer] = message.params[0]
+            self.write(writer, f":{SERVER_NAME} 001 {message.params[0]} :Welcome, GLHF!")
+        elif message.command == 'JOIN':
+            nick = self.clients[writer]
+            for channel in message.params[0].split(','):
+                self.joined.setdefault(writer, set()).add(channel.lstrip('#').lower())
+                self.write(writer, f":{nick}!{nick}@{nick}.{SERVER_NAME} JOIN {channel}")
+        elif message.command == 'PING' and self.answer_pings:
+            self.write(writer, f":{SERVER_NAME} PONG {SERVER_NAME} :{message.trailing}")
+        elif message.command == 'CAP':
+            self.write(writer, f":{SERVER_NAME} CAP * ACK :{message.trailing}")
+
+    def write(self, writer, line):
+        writer.write(f"{line}\r\n".encode('utf-8'))
+
+    def send_line(self, line):
+        for writer in list(self.clients):
+            self.write(writer, line)
+
+    def send_raw(self, data):
+        # Raw bytes, for exercising lines split across chunks
+        for writer in list(self.clients):
+            writer.write(data)
+
+    def members(self, channel):
+        # Connections that joined the channel; everyone if nobody did, as a
+        # convenience when the CLI's --channel doesn't match the bot's
+        writers = [writer for writer, channels in self.joined.items() if channel.lower() in channels]
+        return writers or list(self.clients)
+
+    def privmsg_line(self, user, channel, text, tags=None):
+        prefix = f"@{tags} " if tags else ""
+        return f"{prefix}:{user}!{user}@{user}.{SERVER_NAME} PRIVMSG #{channel} :{text}"
+
+    def send_privmsg(self, user, channel, text, tags=None):
+        line = self.privmsg_line(user, channel, text, tags)
+        for writer in self.members(channel):
+            self.write(writer, line)
+
+    def send_chat(self, messages):
+        # Bulk delivery for load tests: (user, channel, text, tags) tuples, one write per connection
+        outgoing = {}
+        for user, channel, text, tags in messages:
+            line = self.privmsg_line(user, channel, text, tags) + "\r\n"
+            for writer in self.members(channel):
+                outgoing.setdefault(writer, []).append(line)
+        for writer, lines in outgoing.items():
+            writer.write("".join(lines).encode('utf-8'))
+
+    def send_split(self, line, at):
+        # One line in two writes, split at byte `at`, so the bot sees it arrive in pieces
+        data = f"{line}\r\n".encode('utf-8')
+        self.send_raw(data[:at])
+        self.send_raw(data[at:])
+
+    def send_ping(self):
+        self.send_line(f"PING :{SERVER_NAME}")
+
+    def send_reconnect(self):
+        # What Twitch sends shortly before restarting a chat server
+        self.send_line(f":{SERVER_NAME} RECONNECT")
+
+    def drop_clients(self):
+        # Close every connection, as a network blip or server restart would
+        for writer in list(self.clients):
+            writer.close()
+
+    async def wait_for_line(self, predicate, timeout=5):
+        # Wait until a client has sent a line matching predicate and return it
+        async def scan():
+            checked = 0
+            while True:
+                for line in self.received[checked:]:
+                    if predicate(line):
+                        return line
+                checked = len(self.received)
+                self.line_received.clear()
+                await self.line_received.wait()
+        return await asyncio.wait_for(scan(), timeout)
+
+
+async def main(host, port, channel):
+    server = await FakeIRCServer(host, port).start()
+    print(f"Fake Twitch IRC listening on {host}:{server.port}")
+    print("Type '<user> <message>' to send chat, e.g. 'alice !task add write tests'")
+    loop = asyncio.get_running_loop()
+    printed = 0
+    while True:
+        line = await loop.run_in_executor(None, input)
+        for received in server.received[printed:]:
+            print(f"<- {received}")
+        printed = len(server.received)
+        user, _, text = line.strip().partition(' ')
+        if user and text:
+            server.send_privmsg(user, channel, text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Twitch IRC server for local testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6667)
+    parser.add_argument('--channel', default='testchannel')
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.channel))
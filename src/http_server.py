@@ -0,0 +1,317 @@
+import queue
+import selectors
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from async_http import build_environ
+
+DEFAULT_THREADS = 16
+# Idle keep-alive connections and stalled requests are closed after this many seconds
+DEFAULT_TIMEOUT = 30
+# Open event streams each get their own thread outside the pool; past this many, new ones get a 503
+DEFAULT_MAX_STREAMS = 256
+# How long shutdown waits for in-flight requests before giving up on them
+SHUTDOWN_GRACE = 5
+
+
+class WSGIRequestHandler(BaseHTTPRequestHandler):
+    """
+    One connection. Unlike a stock handler it doesn't serve the connection
+    to the end: the server calls handle_one_request each time the socket
+    has a request waiting, and parks it in between.
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive by default
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def __init__(self, request, client_address, server):
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        self.close_connection = False
+        self.stream = None  # an event stream's body, still to be written
+        self.setup()
+
+    def setup(self):
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    def do_GET(self):
+        self.run_wsgi()
+
+    do_HEAD = do_POST = do_PUT = do_DELETE = do_GET
+
+    def log_message(self, format, *args):
+        # Overlays poll constantly; per-request logging would drown the console
+        pass
+
+    def has_pending(self):
+        # A pipelined request may already sit in rfile's buffer, where select can't see it
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return True  # let handle_one_request find out what's wrong
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def run_wsgi(self):
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        length = int(headers.get('content-length') or 0)
+        body = self.rfile.read(length) if length else b''
+        server_name, server_port = self.server.server_address[:2]
+        environ = build_environ(self.command, self.path, self.request_version, headers, body,
+                                server_name, server_port)
+        environ['wsgi.multithread'] = True
+        environ['REMOTE_ADDR'] = self.client_address[0]
+
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = response_headers
+
+        result = self.server.app(environ, start_response)
+        try:
+            code, _, reason = response['status'].partition(' ')
+            header_names = {name.lower(): value for name, value in response['headers']}
+            streaming = header_names.get('content-type', '').startswith('text/event-stream')
+
+            if streaming:
+                if not self.server.acquire_stream():
+                    self.send_error(503, "Too many event streams")
+                    return
+                # Written by the server on a thread of its own, so the pool worker is free again
+                self.stream = result
+                self.send_response(int(code), reason)
+                for name, value in response['headers']:
+                    self.send_header(name, value)
+                self.send_header('Connection', 'close')
+                self.close_connection = True
+                self.end_headers()
+                return
+
+            if 'content-length' in header_names:
+                chunks = result
+            else:
+                # Buffer small responses so they can carry a Content-Length and stay keep-alive
+                chunks = [b''.join(result)]
+                response['headers'].append(('Content-Length', str(len(chunks[0]))))
+
+            self.send_response(int(code), reason)
+            for name, value in response['headers']:
+                self.send_header(name, value)
+            self.end_headers()
+
+            if self.command == 'HEAD':
+                return
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(chunk)
+        except (ConnectionError, socket.timeout):
+            self.close_connection = True
+            if self.stream is not None:
+                self.stream = None
+                self.server.release_stream()
+        finally:
+            if self.server.stopping.is_set():
+                self.close_connection = True
+            if self.stream is None and hasattr(result, 'close'):
+                result.close()
+
+    def write_stream(self):
+        try:
+            if self.command == 'HEAD':
+                return
+            for chunk in self.stream:
+                if chunk:
+                    self.wfile.write(chunk)
+                    self.wfile.flush()
+                if self.server.stopping.is_set():
+                    # Long-lived streams end at the next chunk (at most one keepalive) on shutdown
+                    break
+        except (ConnectionError, socket.timeout):
+            pass
+        finally:
+            if hasattr(self.stream, 'close'):
+                self.stream.close()
+
+
+class PooledWSGIServer(socketserver.TCPServer):
+    """
+    Production HTTP/1.1 server for the overlay Flask app using only the
+    standard library: keep-alive, a fixed pool of worker threads, per-socket
+    timeouts and a graceful shutdown that waits for in-flight requests.
+
+    Workers are only handed connections with a request ready: between
+    requests, keep-alive connections wait in a selector on the idle thread,
+    and event streams are written from a thread per stream (up to
+    max_streams), so neither can tie up the pool.
+    """
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, app, host='0.0.0.0', port=5000, threads=DEFAULT_THREADS, timeout=DEFAULT_TIMEOUT,
+                 max_streams=DEFAULT_MAX_STREAMS):
+        super().__init__((host, port), WSGIRequestHandler)
+        self.app = app
+        self.request_timeout = timeout
+        self.max_streams = max_streams
+        self.requests = queue.Queue()
+        self.active_count = 0
+        self.stream_count = 0
+        self.active_lock = threading.Condition()
+        self.stopping = threading.Event()
+
+        self.selector = selectors.DefaultSelector()
+        self.wakeup, self.waker = socket.socketpair()
+        self.waker.setblocking(False)
+        self.selector.register(self.wakeup, selectors.EVENT_READ)
+        self.parked = []  # connections waiting to be registered with the selector
+        self.parked_lock = threading.Lock()
+
+        # Daemon workers, so a request stuck in the app can't hold up exit
+        self.workers = [
+            threading.Thread(target=self.worker, name=f'http-{i}', daemon=True)
+            for i in range(threads)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.idle_thread = threading.Thread(target=self.watch_idle, name='http-idle', daemon=True)
+        self.idle_thread.start()
+        self.thread = None
+
+    def process_request(self, request, client_address):
+        # New connections wait for their first request like idle ones
+        self.park(WSGIRequestHandler(request, client_address, self))
+
+    def park(self, handler):
+        with self.parked_lock:
+            self.parked.append(handler)
+        self.wake()
+
+    def wake(self):
+        try:
+            self.waker.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # already woken, or shutting down
+
+    def drop(self, handler):
+        try:
+            handler.finish()
+        except OSError:
+            pass
+        self.shutdown_request(handler.connection)
+
+    def watch_idle(self):
+        deadlines = {}  # handler -> time it's closed if still idle
+        next_sweep = time.monotonic() + 1
+        while not self.stopping.is_set():
+            for key, _ in self.selector.select(timeout=1):
+                if key.fileobj is self.wakeup:
+                    try:
+                        self.wakeup.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                self.selector.unregister(key.fileobj)
+                del deadlines[key.data]
+                self.requests.put(key.data)
+
+            with self.parked_lock:
+                parked, self.parked = self.parked, []
+            now = time.monotonic()
+            for handler in parked:
+                try:
+                    self.selector.register(handler.connection, selectors.EVENT_READ, handler)
+                except (ValueError, OSError):
+                    self.drop(handler)
+                    continue
+                deadlines[handler] = now + self.request_timeout
+
+            if now >= next_sweep:
+                next_sweep = now + 1
+                for handler in [handler for handler, deadline in deadlines.items() if deadline <= now]:
+                    self.selector.unregister(handler.connection)
+                    del deadlines[handler]
+                    self.drop(handler)
+
+        for handler in deadlines:
+            self.selector.unregister(handler.connection)
+            self.drop(handler)
+        with self.parked_lock:
+            parked, self.parked = self.parked, []
+        for handler in parked:
+            self.drop(handler)
+        self.selector.close()
+        self.wakeup.close()
+        self.waker.close()
+
+    def worker(self):
+        while True:
+            handler = self.requests.get()
+            with self.active_lock:
+                self.active_count += 1
+            try:
+                handler.handle_one_request()
+            except Exception:
+                self.handle_error(handler.connection, handler.client_address)
+                handler.close_connection = True
+            finally:
+                with self.active_lock:
+                    self.active_count -= 1
+                    self.active_lock.notify_all()
+
+            if handler.stream is not None:
+                threading.Thread(target=self.serve_stream, args=(handler,), name='http-stream',
+                                 daemon=True).start()
+            elif handler.close_connection or self.stopping.is_set():
+                self.drop(handler)
+            elif handler.has_pending():
+                self.requests.put(handler)
+            else:
+                self.park(handler)
+
+    def acquire_stream(self):
+        with self.active_lock:
+            if self.stream_count >= self.max_streams:
+                return False
+            self.stream_count += 1
+            return True
+
+    def release_stream(self):
+        with self.active_lock:
+            self.stream_count -= 1
+            self.active_lock.notify_all()
+
+    def serve_stream(self, handler):
+        try:
+            handler.write_stream()
+        finally:
+            self.drop(handler)
+            self.release_stream()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='http-accept', daemon=True)
+        self.thread.start()
+        return self
+
+    def graceful_shutdown(self, grace=SHUTDOWN_GRACE):
+        # Stop accepting and drop idle connections, then give running requests a moment to finish
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+        self.wake()
+        deadline = time.monotonic() + grace
+        with self.active_lock:
+            while (self.active_count or self.stream_count) and time.monotonic() < deadline:
+                self.active_lock.wait(deadline - time.monotonic())
+
+
+def serve(app, host='0.0.0.0', port=5000, threads=DEFAULT_THREADS, timeout=DEFAULT_TIMEOUT,
+          max_streams=DEFAULT_MAX_STREAMS):
+    return PooledWSGIServer(app, host, port, threads, timeout, max_streams).start()
@@ -0,0 +1,119 @@
+import re
+
+# Tag values in IRCv3 escape a few characters, see https://ircv3.net/specs/extensions/message-tags
+TAG_UNESCAPE_RE = re.compile(r"\\(.)?")
+TAG_UNESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+
+# Lines longer than this without a newline are garbage, not a message
+MAX_PENDING_BYTES = 64 * 1024
+
+
+class IRCMessage:
+    __slots__ = ('tags', 'prefix', 'command', 'params')
+
+    def __init__(self, command, params=(), prefix='', tags=None):
+        self.command = command
+        self.params = params
+        self.prefix = prefix
+        self.tags = tags if tags is not None else {}
+
+    @property
+    def nick(self):
+        # "nick!user@host" -> "nick", server prefixes have no "!"
+        return self.prefix.split('!', 1)[0]
+
+    @property
+    def channel(self):
+        if self.params and self.params[0].startswith('#'):
+            return self.params[0][1:]
+        return ''
+
+    @property
+    def trailing(self):
+        return self.params[-1] if self.params else ''
+
+    def __repr__(self):
+        return f"IRCMessage({self.command!r}, {self.params!r}, prefix={self.prefix!r}, tags={self.tags!r})"
+
+
+def _unescape_tag(match):
+    char = match.group(1)
+    if char is None:
+        return ''
+    return TAG_UNESCAPES.get(char, char)
+
+
+def parse_tags(raw):
+    tags = {}
+    for item in raw.split(';'):
+        key, sep, value = item.partition('=')
+        if '\\' in value:
+            value = TAG_UNESCAPE_RE.sub(_unescape_tag, value)
+        tags[key] = value
+    return tags
+
+
+def parse_line(line):
+    """
+    Parse one IRC line (without the line ending) into an IRCMessage.
+    Returns None for blank or malformed lines.
+    """
+    tags = None
+    prefix = ''
+
+    if line.startswith('@'):
+        raw_tags, _, line = line.partition(' ')
+        tags = parse_tags(raw_tags[1:])
+        line = line.lstrip(' ')
+
+    if line.startswith(':'):
+        prefix, _, line = line.partition(' ')
+        prefix = prefix[1:]
+        line = line.lstrip(' ')
+
+    # Everything after " :" is the trailing parameter and may contain spaces
+    head, sep, trailing = line.partition(' :')
+    params = head.split()
+    if not params:
+        return None
+    command = params.pop(0).upper()
+    if sep:
+        params.append(trailing)
+
+    return IRCMessage(command, params, prefix, tags)
+
+
+class LineBuffer:
+    """
+    Receive buffer that turns arbitrary socket chunks into complete IRC lines.
+    Partial lines are kept until the rest arrives in a later chunk.
+    """
+
+    def __init__(self):
+        self.pending = b''
+
+    def clear(self):
+        self.pending = b''
+
+    def feed(self, data):
+        if self.pending:
+            data = self.pending + data
+        lines = data.split(b'\n')
+        self.pending = lines.pop()
+        if len(self.pending) > MAX_PENDING_BYTES:
+            print(f"Dropping {len(self.pending)} bytes of unterminated IRC data")
+            self.pending = b''
+        # Decode per line so multi-byte characters split across chunks survive
+        return [line.rstrip(b'\r').decode('utf-8', errors='replace') for line in lines if line.strip()]
+
+    def feed_messages(self, data):
+        return parse_batch(self.feed(data))
+
+
+def parse_batch(lines):
+    messages = []
+    for line in lines:
+        message = parse_line(line)
+        if message is not None:
+            messages.append(message)
+    return messages
@@ -0,0 +1,122 @@
+import bisect
+import itertools
+import threading
+
+# Keys per chunk of a Ranking; a chunk splits in two when it doubles
+CHUNK_SIZE = 512
+
+
+class Ranking:
+    """
+    Users ordered by score, highest first, ties by name, as (-score, user)
+    keys in sorted chunks of at most 2 * CHUNK_SIZE (the layout of
+    sortedcontainers' SortedList). A change is a binary search over the
+    chunk maxima and one within a chunk, out at the old score and back in
+    at the new one, so it never shifts more than a chunk. The top k is the
+    first k keys; a user's rank adds up the chunk lengths before theirs.
+    Users without a score aren't listed.
+    """
+
+    def __init__(self, scores=None):
+        self.scores = {user: score for user, score in (scores or {}).items() if score > 0}
+        keys = sorted((-score, user) for user, score in self.scores.items())
+        self.chunks = [keys[i:i + CHUNK_SIZE] for i in range(0, len(keys), CHUNK_SIZE)]
+        self.maxes = [chunk[-1] for chunk in self.chunks]
+
+    def __len__(self):
+        return len(self.scores)
+
+    def insert(self, key):
+        if not self.chunks:
+            self.chunks.append([key])
+            self.maxes.append(key)
+            return
+        index = bisect.bisect_left(self.maxes, key)
+        if index == len(self.maxes):
+            index -= 1
+            self.chunks[index].append(key)
+            self.maxes[index] = key
+        else:
+            bisect.insort(self.chunks[index], key)
+        chunk = self.chunks[index]
+        if len(chunk) > 2 * CHUNK_SIZE:
+            self.chunks[index:index + 1] = [chunk[:CHUNK_SIZE], chunk[CHUNK_SIZE:]]
+            self.maxes[index:index + 1] = [chunk[CHUNK_SIZE - 1], chunk[-1]]
+
+    def remove(self, key):
+        index = bisect.bisect_left(self.maxes, key)
+        chunk = self.chunks[index]
+        del chunk[bisect.bisect_left(chunk, key)]
+        if chunk:
+            self.maxes[index] = chunk[-1]
+        else:
+            del self.chunks[index]
+            del self.maxes[index]
+
+    def add(self, user, amount=1):
+        score = self.scores.get(user, 0)
+        if score:
+            self.remove((-score, user))
+        score += amount
+        self.scores[user] = score
+        self.insert((-score, user))
+
+    def clear(self):
+        self.scores = {}
+        self.chunks = []
+        self.maxes = []
+
+    def top(self, k):
+        # [(rank, user, score)]; tied users share a rank
+        standings = []
+        rank = 0
+        previous = None
+        keys = itertools.chain.from_iterable(self.chunks)
+        for index, (negative, user) in enumerate(itertools.islice(keys, k)):
+            if negative != previous:
+                rank = index + 1
+                previous = negative
+            standings.append((rank, user, -negative))
+        return standings
+
+    def rank(self, user):
+        # (rank, score), or None if the user has no score
+        score = self.scores.get(user)
+        if not score:
+            return None
+        # (-score,) sorts before every key with that score, so this counts the users ahead
+        probe = (-score,)
+        index = bisect.bisect_left(self.maxes, probe)
+        ahead = sum(len(chunk) for chunk in self.chunks[:index])
+        return ahead + bisect.bisect_left(self.chunks[index], probe) + 1, score
+
+
+class Leaderboard:
+    """
+    Daily and all-time rankings of completed tasks, updated by TaskManager
+    on each completion and daily reset, so chat, the overlay and the
+    dashboard read standings without going through user_stats.
+    """
+
+    def __init__(self, user_stats):
+        self.lock = threading.Lock()
+        self.daily = Ranking({user: stats['daily'] for user, stats in user_stats.items()})
+        self.total = Ranking({user: stats['total'] for user, stats in user_stats.items()})
+        self.boards = {'daily': self.daily, 'total': self.total}
+
+    def completed(self, user):
+        with self.lock:
+            self.daily.add(user)
+            self.total.add(user)
+
+    def reset_daily(self):
+        with self.lock:
+            self.daily.clear()
+
+    def top(self, board, k):
+        with self.lock:
+            return self.boards[board].top(k)
+
+    def rank(self, board, user):
+        with self.lock:
+            return self.boards[board].rank(user)
@@ -0,0 +1,178 @@
+import bisect
+import os
+import threading
+
+from dotenv import load_dotenv
+
+# Latency buckets in seconds, from 50 µs (a chat command) up to 10 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Size buckets in bytes, from 1 KiB to 16 MiB
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Metrics are created at import time, so the switch has to be read before .env is
+# otherwise loaded. BOT_METRICS=0 turns every metric into a no-op.
+load_dotenv()
+ENABLED = os.getenv('BOT_METRICS', '1').lower() not in ('0', 'false', 'no')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    pairs = [(name, value) for name, value in pairs if name]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """
+    Base for the three metric kinds. A metric has at most one label (e.g.
+    the command name); values are kept per label value, '' when unlabelled.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.lock = threading.Lock()
+        self.values = {}
+        self.functions = {}
+
+    def set_function(self, fn, label=''):
+        # Read the value from fn at scrape time, for numbers the code already keeps
+        self.functions[label] = fn
+
+    def current_values(self):
+        with self.lock:
+            values = dict(self.values)
+        for label, fn in list(self.functions.items()):
+            try:
+                values[label] = fn()
+            except Exception as e:
+                print(f"Error reading metric {self.name}: {e}")
+        return values
+
+    def samples(self):
+        for label, value in sorted(self.current_values().items()):
+            yield self.name, [(self.label, label)], value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, label=''):
+        with self.lock:
+            self.values[label] = self.values.get(label, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, label=''):
+        with self.lock:
+            self.values[label] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, label=None, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, label)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, label=''):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(label)
+            if state is None:
+                # Per-bucket (not cumulative) counts, the last one being +Inf, then sum
+                state = self.values[label] = [0] * (len(self.buckets) + 1) + [0]
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self.lock:
+            values = {label: list(state) for label, state in self.values.items()}
+        for label, state in sorted(values.items()):
+            labels = [(self.label, label)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + [('le', format_value(bound))], cumulative
+            yield f"{self.name}_sum", labels, state[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class NullMetric:
+    # Stands in for every metric when metrics are off, so call sites stay unconditional
+
+    def inc(self, amount=1, label=''):
+        pass
+
+    def set(self, value, label=''):
+        pass
+
+    def observe(self, value, label=''):
+        pass
+
+    def set_function(self, fn, label=''):
+        pass
+
+
+NULL_METRIC = NullMetric()
+
+
+class Registry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, cls, name, help, **options):
+        if not self.enabled:
+            return NULL_METRIC
+        with self.lock:
+            # Modules imported twice (e.g. __main__ and bot) share the same metric
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **options)
+            return metric
+
+    def counter(self, name, help, label=None):
+        return self.register(Counter, name, help, label=label)
+
+    def gauge(self, name, help, label=None):
+        return self.register(Gauge, name, help, label=label)
+
+    def histogram(self, name, help, label=None, buckets=LATENCY_BUCKETS):
+        return self.register(Histogram, name, help, label=label, buckets=buckets)
+
+    def render(self):
+        # Prometheus text exposition format
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(ENABLED)
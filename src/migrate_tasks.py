@@ -0,0 +1,30 @@
+import argparse
+import os
+import sys
+
+from task_store import JournalStore, SqliteStore
+
+
+def migrate(json_path, db_path):
+    if not os.path.exists(json_path):
+        sys.exit(f"{json_path} not found")
+
+    # JournalStore.load replays any uncompacted journal on top of the snapshot
+    tasks, user_stats = JournalStore(json_path).load()
+
+    store = SqliteStore(db_path)
+    store.import_data(tasks, user_stats)
+    imported_tasks, imported_stats = store.load()
+    store.close()
+
+    if len(imported_tasks) < len(tasks) or len(imported_stats) < len(user_stats):
+        sys.exit("Migration incomplete: row counts in the database do not match the JSON store")
+    print(f"Imported {len(tasks)} tasks and {len(user_stats)} user stats from {json_path} into {db_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import twitch_tasks.json into the SQLite task store")
+    parser.add_argument('json_path', nargs='?', default='twitch_tasks.json')
+    parser.add_argument('db_path', nargs='?', default='twitch_tasks.db')
+    args = parser.parse_args()
+    migrate(args.json_path, args.db_path)
@@ -0,0 +1,35 @@
+import gzip
+import json
+import os
+import threading
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 512
+
+# Distinguishes ETags across restarts, when state versions start over at 0
+ETAG_PREFIX = os.urandom(4).hex()
+
+
+class CachedJSON:
+    """
+    One serialized JSON view of bot state (plus its gzip variant and ETag),
+    rebuilt only when the caller's cache key changes. Keys are TaskManager
+    state versions, so repeated polls between changes cost a dict lookup.
+    """
+
+    def __init__(self, build_fn):
+        self.build_fn = build_fn
+        self.lock = threading.Lock()
+        self.key = None
+        self.body = b''
+        self.gzipped = None
+        self.etag = ''
+
+    def get(self, key):
+        with self.lock:
+            if key != self.key:
+                self.body = json.dumps(self.build_fn(), separators=(',', ':')).encode('utf-8')
+                self.gzipped = gzip.compress(self.body, 6) if len(self.body) >= GZIP_MIN_SIZE else None
+                self.etag = f'W/"{ETAG_PREFIX}-' + '-'.join(str(part) for part in key) + '"'
+                self.key = key
+            return self.body, self.gzipped, self.etag
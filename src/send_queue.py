@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import deque
+
+# Twitch chat limits: messages per 30 seconds, see https://dev.twitch.tv/docs/irc/#rate-limits
+NORMAL_LIMIT = 20
+MODERATOR_LIMIT = 100
+LIMIT_PERIOD = 30
+
+PRIORITY_HIGH = 0    # timer phase announcements
+PRIORITY_NORMAL = 1  # replies to chat commands
+
+MAX_QUEUE_SIZE = 200
+MAX_MESSAGE_LENGTH = 500
+# Start merging @user replies once this many are waiting
+COALESCE_BACKLOG = 3
+COALESCE_SEPARATOR = " | "
+
+
+class TokenBucket:
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+
+    def set_limit(self, capacity, period):
+        self.refill()
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = min(self.tokens, capacity)
+
+    def refill(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def try_take(self, now=None):
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self, now=None):
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class OutboundQueue:
+    """
+    Rate-limited queue of outgoing chat messages.
+    Callers only ever append; a sender (thread or asyncio task) drains it
+    at the rate Twitch allows, so handle_message never waits on the network.
+    """
+
+    def __init__(self, max_size=MAX_QUEUE_SIZE):
+        self.max_size = max_size
+        self.queues = {PRIORITY_HIGH: deque(), PRIORITY_NORMAL: deque()}
+        self.bucket = TokenBucket(NORMAL_LIMIT, LIMIT_PERIOD)
+        self.is_moderator = False
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.on_put = None  # optional wakeup hook for asyncio senders
+
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.coalesced_count = 0
+
+    def depth(self):
+        return len(self.queues[PRIORITY_HIGH]) + len(self.queues[PRIORITY_NORMAL])
+
+    def set_moderator(self, is_moderator):
+        with self.lock:
+            if is_moderator != self.is_moderator:
+                self.is_moderator = is_moderator
+                limit = MODERATOR_LIMIT if is_moderator else NORMAL_LIMIT
+                self.bucket.set_limit(limit, LIMIT_PERIOD)
+
+    def put(self, channel, text, priority=PRIORITY_NORMAL):
+        with self.lock:
+            if self.depth() >= self.max_size:
+                normal = self.queues[PRIORITY_NORMAL]
+                if priority == PRIORITY_HIGH and normal:
+                    # Make room for the announcement by dropping the oldest reply
+                    normal.popleft()
+                    self.dropped_count += 1
+                else:
+                    self.dropped_count += 1
+                    return False
+            self.queues[priority].append((channel, text))
+            self.not_empty.notify()
+        if self.on_put:
+            self.on_put()
+        return True
+
+    def requeue(self, channel, text):
+        # Put a message that failed to send back at the front of the line
+        with self.lock:
+            self.queues[PRIORITY_HIGH].appendleft((channel, text))
+            self.not_empty.notify()
+
+    def mark_sent(self):
+        # Counted by the sender once the write succeeded, so a requeued retry isn't counted twice
+        with self.lock:
+            self.sent_count += 1
+
+    def _pop(self):
+        high = self.queues[PRIORITY_HIGH]
+        if high:
+            return high.popleft()
+
+        normal = self.queues[PRIORITY_NORMAL]
+        channel, text = normal.popleft()
+        if len(normal) + 1 < COALESCE_BACKLOG or not text.startswith('@'):
+            return channel, text
+
+        # Backed up: fold the following @user replies for the same channel into one message
+        while normal:
+            next_channel, next_text = normal[0]
+            if next_channel != channel or not next_text.startswith('@'):
+                break
+            combined = text + COALESCE_SEPARATOR + next_text
+            if len(combined) > MAX_MESSAGE_LENGTH:
+                break
+            normal.popleft()
+            text = combined
+            self.coalesced_count += 1
+        return channel, text
+
+    def pop_ready(self, now=None):
+        """
+        Return (channel, text) if a message is waiting and the rate limit
+        allows sending it now, otherwise None.
+        """
+        with self.lock:
+            if not self.depth() or not self.bucket.try_take(now):
+                return None
+            return self._pop()
+
+    def wait_time(self, now=None):
+        # Seconds until pop_ready can return something, None if the queue is empty
+        with self.lock:
+            if not self.depth():
+                return None
+            return self.bucket.time_until_token(now)
+
+    def get(self):
+        # Blocking version of pop_ready for sender threads
+        with self.lock:
+            while True:
+                while not self.depth():
+                    self.not_empty.wait()
+                delay = self.bucket.time_until_token()
+                if delay <= 0:
+                    self.bucket.try_take()
+                    return self._pop()
+                self.not_empty.wait(delay)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "depth": self.depth(),
+                "high_priority_depth": len(self.queues[PRIORITY_HIGH]),
+                "sent": self.sent_count,
+                "dropped": self.dropped_count,
+                "coalesced": self.coalesced_count,
+                "moderator": self.is_moderator,
+                "tokens": round(self.bucket.tokens, 2),
+            }
@@ -0,0 +1,372 @@
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import http_server
+from events import KEEPALIVE_INTERVAL
+from metrics import CONTENT_TYPE
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+# Each shard runs the single-loop asyncio bot
+SHARD_ENTRY = os.path.join(SRC_DIR, 'async_bot.py')
+# Crashed shards are restarted after this delay, doubling up to RESTART_MAX_DELAY
+RESTART_DELAY = 1
+RESTART_MAX_DELAY = 30
+# A shard that stayed up this long counts as healthy again, resetting the delay
+RESTART_RESET_AFTER = 60
+# How long a shard gets to save its data after SIGTERM before it is killed
+STOP_GRACE = 10
+# Proxy timeout for ordinary (non-streaming) requests to a shard
+PROXY_TIMEOUT = 10
+# A proxied event stream is dropped if the shard sends nothing, not even a keepalive, for this long
+STREAM_IDLE_TIMEOUT = 2 * KEEPALIVE_INTERVAL
+
+# Headers that describe one HTTP hop and must not be forwarded
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'te', 'upgrade', 'proxy-connection'}
+
+
+class Shard:
+    __slots__ = ('index', 'channels', 'port', 'process', 'restarts', 'started_at', 'restart_at', 'delay')
+
+    def __init__(self, index, channels, port):
+        self.index = index
+        self.channels = channels
+        self.port = port
+        self.process = None
+        self.restarts = 0
+        self.started_at = None
+        self.restart_at = None
+        self.delay = RESTART_DELAY
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+
+class Supervisor:
+    """
+    Runs the bot as one child process per shard. Channels are dealt out to
+    shards round-robin; each shard has its own IRC connection, send queue
+    and overlay HTTP port. Task and timer state lives in per-channel files
+    (CHANNEL_DATA_DIR/<channel>/), so a crashed shard is simply started
+    again and replays its journal.
+    """
+
+    def __init__(self, channels, shard_count, base_port, data_dir='channels', env=None, cwd=None,
+                 entry=SHARD_ENTRY):
+        shard_count = max(1, min(shard_count, len(channels)))
+        self.shards = [
+            Shard(index, channels[index::shard_count], base_port + index)
+            for index in range(shard_count)
+        ]
+        self.shard_by_channel = {channel: shard for shard in self.shards for channel in shard.channels}
+        # Unprefixed overlay routes go to the first channel, which is first in shard 0
+        self.default_shard = self.shards[0]
+        self.data_dir = data_dir
+        self.env = dict(os.environ if env is None else env)
+        self.cwd = cwd
+        self.entry = entry
+        self.stopping = False
+        self.lock = threading.Lock()
+
+    def start_shard(self, shard):
+        env = dict(self.env)
+        env.update({
+            'TWITCH_CHANNEL': ','.join(shard.channels),
+            'HTTP_PORT': str(shard.port),
+            'CHANNEL_DATA_DIR': self.data_dir,
+            'BOT_HEADLESS': '1',
+            'BOT_SHARD': str(shard.index),
+        })
+        # Own session, so Ctrl+C reaches only the supervisor, which then stops shards in order
+        shard.process = subprocess.Popen([sys.executable, self.entry], env=env, cwd=self.cwd,
+                                         start_new_session=True)
+        shard.started_at = time.monotonic()
+        shard.restart_at = None
+        print(f"Shard {shard.index} started (pid {shard.process.pid}, port {shard.port}, "
+              f"{len(shard.channels)} channels)")
+
+    def start(self):
+        with self.lock:
+            for shard in self.shards:
+                self.start_shard(shard)
+        return self
+
+    def check(self):
+        # Restart shards that died, with a per-shard exponential backoff
+        now = time.monotonic()
+        with self.lock:
+            if self.stopping:
+                return
+            for shard in self.shards:
+                if shard.alive():
+                    if now - shard.started_at >= RESTART_RESET_AFTER:
+                        shard.delay = RESTART_DELAY
+                    continue
+                if shard.restart_at is None:
+                    print(f"Shard {shard.index} exited with code {shard.process.returncode}; "
+                          f"restarting in {shard.delay}s")
+                    shard.restart_at = now + shard.delay
+                    shard.delay = min(shard.delay * 2, RESTART_MAX_DELAY)
+                elif now >= shard.restart_at:
+                    shard.restarts += 1
+                    self.start_shard(shard)
+
+    def run(self, interval=1):
+        while not self.stopping:
+            self.check()
+            time.sleep(interval)
+
+    def stop(self, grace=STOP_GRACE):
+        with self.lock:
+            self.stopping = True
+            for shard in self.shards:
+                if shard.alive():
+                    shard.process.terminate()
+        deadline = time.monotonic() + grace
+        for shard in self.shards:
+            if shard.process is None:
+                continue
+            try:
+                shard.process.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                print(f"Shard {shard.index} did not stop in time; killing it")
+                shard.process.kill()
+                shard.process.wait()
+
+    def stats(self):
+        return [
+            {
+                "shard": shard.index,
+                "pid": shard.process.pid if shard.process else None,
+                "alive": shard.alive(),
+                "port": shard.port,
+                "channels": shard.channels,
+                "restarts": shard.restarts,
+            }
+            for shard in self.shards
+        ]
+
+
+def merge_stats(total, stats):
+    # Sums counters across shards; flags are true only if true on every shard
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            total[key] = total.get(key, True) and value
+        elif isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+        elif isinstance(value, dict):
+            merge_stats(total.setdefault(key, {}), value)
+    return total
+
+
+def with_shard_label(sample, index):
+    # 'name{a="b"} 1' -> 'name{shard="0",a="b"} 1'; 'name 1' -> 'name{shard="0"} 1'
+    name, brace, rest = sample.partition('{')
+    if brace and ' ' not in name:
+        return f'{name}{{shard="{index}",{rest}'
+    name, _, value = sample.partition(' ')
+    return f'{name}{{shard="{index}"}} {value}'
+
+
+class ShardProxy:
+    """
+    WSGI front for the supervisor: /<channel>/... goes to the shard serving
+    that channel, unprefixed routes to the first channel's shard, /shards
+    lists the shards, /queue adds up every shard's queue counters,
+    /connection lists each shard's IRC connection health and /metrics
+    combines every shard's metrics under a `shard` label.
+    """
+
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+        self.local = threading.local()  # per worker thread: port -> keep-alive connection
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '/')
+        if path == '/shards':
+            return self.json_response(start_response, self.supervisor.stats())
+        if path == '/queue':
+            return self.json_response(start_response, self.aggregate('/queue'))
+        if path == '/connection':
+            return self.json_response(start_response, self.collect('/connection'))
+        if path == '/metrics':
+            start_response('200 OK', [('Content-Type', CONTENT_TYPE), ('Cache-Control', 'no-cache')])
+            return [self.merge_metrics().encode('utf-8')]
+
+        first, _, rest = path.lstrip('/').partition('/')
+        shard = self.supervisor.shard_by_channel.get(first.lower()) if rest else None
+        return self.forward(shard or self.supervisor.default_shard, environ, start_response)
+
+    def json_response(self, start_response, data):
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        start_response('200 OK', [('Content-Type', 'application/json'), ('Cache-Control', 'no-cache')])
+        return [body]
+
+    def connection(self, port):
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        conn = connections.get(port)
+        if conn is None:
+            conn = connections[port] = http.client.HTTPConnection('127.0.0.1', port, timeout=PROXY_TIMEOUT)
+        return conn
+
+    def drop_connection(self, port):
+        conn = self.local.connections.pop(port, None)
+        if conn is not None:
+            conn.close()
+
+    def request(self, port, method, target, body=None, headers=None):
+        # One retry covers a pooled connection the shard closed while idle
+        for attempt in range(2):
+            conn = self.connection(port)
+            try:
+                conn.request(method, target, body, headers or {})
+                return conn.getresponse()
+            except (ConnectionError, http.client.HTTPException, OSError):
+                self.drop_connection(port)
+                if attempt:
+                    raise
+
+    def aggregate(self, path):
+        total = {}
+        for shard in self.supervisor.shards:
+            try:
+                response = self.request(shard.port, 'GET', path)
+                merge_stats(total, json.loads(response.read()))
+            except (ConnectionError, http.client.HTTPException, OSError, ValueError):
+                continue  # a restarting shard is left out until it is back
+        return total
+
+    def collect(self, path):
+        # Per-shard results, for stats (like latencies) that don't add up across shards
+        results = []
+        for shard in self.supervisor.shards:
+            try:
+                response = self.request(shard.port, 'GET', path)
+                results.append({"shard": shard.index, **json.loads(response.read())})
+            except (ConnectionError, http.client.HTTPException, OSError, ValueError):
+                results.append({"shard": shard.index, "unavailable": True})
+        return results
+
+    def merge_metrics(self):
+        # Prometheus wants each metric's samples together, so regroup the shards' output by family
+        families = {}  # name -> (HELP/TYPE lines, samples)
+        for shard in self.supervisor.shards:
+            try:
+                text = self.request(shard.port, 'GET', '/metrics').read().decode('utf-8')
+            except (ConnectionError, http.client.HTTPException, OSError, ValueError):
+                continue
+            family = None
+            for line in text.splitlines():
+                if line.startswith('# '):
+                    family = families.setdefault(line.split(' ', 3)[2], ([], []))
+                    if line not in family[0]:
+                        family[0].append(line)
+                elif line and family is not None:
+                    family[1].append(with_shard_label(line, shard.index))
+        lines = []
+        for headers, samples in families.values():
+            lines.extend(headers)
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+    def forward(self, shard, environ, start_response):
+        target = environ.get('PATH_INFO', '/')
+        if environ.get('QUERY_STRING'):
+            target += '?' + environ['QUERY_STRING']
+        headers = {
+            key[5:].replace('_', '-').title(): value
+            for key, value in environ.items()
+            if key.startswith('HTTP_') and key[5:].lower().replace('_', '-') not in HOP_HEADERS
+        }
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else None
+
+        if target.split('?')[0].endswith('/events'):
+            return self.forward_stream(shard, target, headers, start_response)
+
+        try:
+            response = self.request(shard.port, environ['REQUEST_METHOD'], target, body, headers)
+            data = response.read()
+        except (ConnectionError, http.client.HTTPException, OSError):
+            start_response('502 Bad Gateway', [('Content-Type', 'text/plain')])
+            return [f"shard {shard.index} unavailable\n".encode('utf-8')]
+        start_response(f"{response.status} {response.reason}",
+                       [(name, value) for name, value in response.getheaders() if name.lower() not in HOP_HEADERS])
+        return [data]
+
+    def forward_stream(self, shard, target, headers, start_response):
+        # Server-Sent Events get their own connection, held open for the stream's lifetime.
+        # Only this part runs on a front worker; the front writes the stream from its own thread.
+        conn = http.client.HTTPConnection('127.0.0.1', shard.port, timeout=PROXY_TIMEOUT)
+        try:
+            conn.request('GET', target, headers=headers)
+            sock = conn.sock  # getresponse hands a Connection: close socket over to the response
+            response = conn.getresponse()
+            sock.settimeout(STREAM_IDLE_TIMEOUT)
+        except (ConnectionError, http.client.HTTPException, OSError):
+            conn.close()
+            start_response('502 Bad Gateway', [('Content-Type', 'text/plain')])
+            return [f"shard {shard.index} unavailable\n".encode('utf-8')]
+        start_response(f"{response.status} {response.reason}",
+                       [(name, value) for name, value in response.getheaders() if name.lower() not in HOP_HEADERS])
+
+        def stream():
+            try:
+                while True:
+                    chunk = response.read1(65536)
+                    if not chunk:
+                        break
+                    yield chunk
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                conn.close()
+
+        return stream()
+
+
+def main():
+    load_dotenv()
+    channels = [name.strip().lstrip('#').lower() for name in os.getenv('TWITCH_CHANNEL', '').split(',')]
+    channels = list(dict.fromkeys(name for name in channels if name))
+    if not channels:
+        print("TWITCH_CHANNEL is not set")
+        sys.exit(1)
+
+    http_port = int(os.getenv('HTTP_PORT', '5000'))
+    supervisor = Supervisor(
+        channels,
+        shard_count=int(os.getenv('BOT_SHARDS') or os.cpu_count() or 1),
+        base_port=int(os.getenv('SHARD_BASE_PORT', http_port + 1)),
+        data_dir=os.getenv('CHANNEL_DATA_DIR', 'channels'),
+    ).start()
+    front = http_server.serve(
+        ShardProxy(supervisor), port=http_port,
+        threads=int(os.getenv('HTTP_THREADS', http_server.DEFAULT_THREADS)),
+        timeout=int(os.getenv('HTTP_TIMEOUT', http_server.DEFAULT_TIMEOUT)),
+        max_streams=int(os.getenv('HTTP_MAX_STREAMS', http_server.DEFAULT_MAX_STREAMS))
+    )
+    print(f"{len(channels)} channels on {len(supervisor.shards)} shards; "
+          f"overlays at http://localhost:{http_port}/<channel>/timer.html")
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        front.graceful_shutdown()
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,30 @@ import uuid
 import os
 import time
 import json
-from datetime import datetime, date, timedelta
-from collections import Counter
-from textwrap import wrap
-import pygame
-from rich.console import Console, Group
-from rich.table import Table
-from rich.panel import Panel
-from rich.layout import Layout
-from rich.text import Text
-from rich import box
-from rich.padding import Padding
-from rich.align import Align
-from rich.style import Style
-from rich.columns import Columns
-import curses
-from curses import ascii
-from io import StringIO
+import threading
+from functools import partial
+from datetime import date
 import configparser
+from task_store import atomic_write_json, open_store
+from task_record import Task, iso_from_ordinal, today_ordinal
+from archive import TaskArchive, period_start, top
+from leaderboard import Leaderboard
+from events import EventHub
+from big_text import DEFAULT_FONT, get_font
+from timer_scheduler import shared_scheduler
+from audio import create_sink, shared_worker
 
 class TaskManager:
-    def __init__(self, file_path='tasks.json', phase_change_callback=None):
-        # Load config
+    def __init__(self, file_path='tasks.json', phase_change_callback=None, storage='json', scheduler=None,
+                 sound='host'):
+        # Config and blocked users sit next to the task file, so each channel has its own
+        data_dir = os.path.dirname(file_path)
         self.config = configparser.ConfigParser()
-        self.config_file = 'timer.cfg'
+        self.config_file = os.path.join(data_dir, 'timer.cfg')
         
         # Set defaults in case config file doesn't exist
         default_volume = 40
+        font_name = DEFAULT_FONT
         self.focus_duration = 30
         self.short_break_duration = 10
         self.long_break_duration = 15
@@ -40,287 +37,450 @@ class TaskManager:
             self.focus_duration = self.config.getint('Timer', 'focus_duration', fallback=30)
             self.short_break_duration = self.config.getint('Timer', 'short_break_duration', fallback=10)
             self.long_break_duration = self.config.getint('Timer', 'long_break_duration', fallback=15)
+            font_name = self.config.get('Timer', 'font', fallback=DEFAULT_FONT)
         else:
             # Create default config file if it doesn't exist
             self.config['Timer'] = {
                 'volume': '40',
                 'focus_duration': '30',
                 'short_break_duration': '10',
-                'long_break_duration': '15'
+                'long_break_duration': '15',
+                'font': DEFAULT_FONT
             }
             with open(self.config_file, 'w') as configfile:
                 self.config.write(configfile)
+        self.big_font = get_font(font_name)
 
-        # Initialize pygame mixer for sound playback
-        pygame.mixer.init()
-        self.complete_sound = pygame.mixer.Sound(os.path.join('sounds', 'complete.mp3'))
         self.volume = default_volume / 100  # Convert percentage to float
-        self.set_volume(self.volume)
 
         # Rest of your initialization code...
         self.file_path = file_path
+        self.events = EventHub()  # pushes task and timer changes to overlays
+        # Phase-change sounds play on the shared audio worker: on this host ('host'),
+        # in the overlay ('browser') or nowhere ('none'). Nothing is loaded until needed.
+        self.sound_sink = create_sink(sound, self.events)
+        self.audio = shared_worker
+        self.state_version = 0  # bumped on every change, used as the overlay cache key
+        # Guards tasks, their indexes and user_stats: chat mutates them while HTTP threads
+        # build snapshots. Taken before the store's own lock, never after it
+        self.lock = threading.RLock()
+        self.store = open_store(file_path, storage, self.snapshot_data)
         self.tasks = {}
         self.user_stats = {}
+        # Tasks from past days are moved here by clean_old_tasks instead of being dropped
+        self.archive = TaskArchive(os.path.join(data_dir, 'archive'))
         self.load_data()
-        self.clean_old_tasks()
+        # Only rewrite the store at startup if there are tasks from earlier days to drop
+        if any(day != today_ordinal() for day in self.tasks_by_date):
+            self.clean_old_tasks()
         
-        # Timer attributes
-        self.timer_start = None
-        self.timer_end = None
-        self.timer_type = None
+        # Timer attributes. Times are time.monotonic() values, so clock jumps
+        # (NTP, DST) can't stretch or shrink a phase
+        self.timer_active = False
         self.timer_paused = False
-        self.timer_pause_start = None
+        self.timer_deadline = None  # when the running phase ends
+        self.paused_remaining = 0.0  # seconds left in a paused phase
+        self.timer_state_path = os.path.splitext(file_path)[0] + '.timer.json'
         self.current_phase = 'focus'
         self.pomodoro_count = 0
         self.max_pomodoros = 4
+        # Phase changes are driven by a deadline on the scheduler, not by the dashboard
+        self.scheduler = scheduler or shared_scheduler
+        self.phase_timer = None
+        self.phase_generation = 0
+        self.timer_lock = threading.RLock()
         self.total_completed_pomodoros = 0
         self.last_pomodoro_date = date.today()
 
-        self.console = Console()
-        self.blocked_users_file = 'blocked-users.txt'
+        self.console = None  # rich is imported with the first dashboard frame
+        self.dashboard = None
+        self.blocked_users_file = os.path.join(data_dir, 'blocked-users.txt')
         self.blocked_users = self.load_blocked_users()
         self.phase_change_callback = phase_change_callback
+        self.restore_timer_state()
 
     def load_data(self):
-        if os.path.exists(self.file_path):
-            with open(self.file_path, 'r') as f:
-                data = json.load(f)
-                self.tasks = data.get('tasks', {})
-                self.user_stats = data.get('user_stats', {})
-                
-                # Convert date strings back to date objects
-                for task in self.tasks.values():
-                    task['date'] = datetime.strptime(task['date'], "%Y-%m-%d").date()
+        # Snapshot plus any journal entries written since it was taken
+        tasks, self.user_stats = self.store.load()
+        self.tasks = {task_id: Task.from_json(task) for task_id, task in tasks.items()}
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self):
+        # Secondary indexes over self.tasks, kept in step by every mutation.
+        # Inner dicts are used as insertion-ordered sets of task IDs.
+        self.tasks_by_user = {}
+        self.open_tasks_by_user = {}
+        self.tasks_by_date = {}
+        self.open_task_ids = {}
+        for task_id, task in self.tasks.items():
+            self.index_task(task_id, task)
+
+        # Running sums of user_stats, so the dashboard never re-adds them
+        self.completed_today = sum(stats['daily'] for stats in self.user_stats.values())
+        self.completed_total = sum(stats['total'] for stats in self.user_stats.values())
+        # Sorted once here, then kept in order by complete_task and reset_daily_stats
+        self.leaderboard = Leaderboard(self.user_stats)
+
+    def index_task(self, task_id, task):
+        self.tasks_by_user.setdefault(task.user, {})[task_id] = None
+        self.tasks_by_date.setdefault(task.day, {})[task_id] = None
+        if not task.completed:
+            self.open_tasks_by_user.setdefault(task.user, {})[task_id] = None
+            self.open_task_ids[task_id] = None
+
+    def unindex_task(self, task_id, task):
+        discard_from_index(self.tasks_by_user, task.user, task_id)
+        discard_from_index(self.tasks_by_date, task.day, task_id)
+        discard_from_index(self.open_tasks_by_user, task.user, task_id)
+        self.open_task_ids.pop(task_id, None)
+
+    def changed(self, event=None, data=None):
+        self.state_version += 1
+        if event:
+            self.events.publish(event, data)
+
+    def snapshot_data(self):
+        # Called from HTTP threads too; copies everything, so callers serialize it outside the lock
+        with self.lock:
+            return {
+                'tasks': {task_id: task.to_json() for task_id, task in self.tasks.items()},
+                'user_stats': {user: dict(stats) for user, stats in self.user_stats.items()}
+            }
 
     def save_data(self):
-        data_to_save = {
-            'tasks': {
-                task_id: {**task, 'date': task['date'].isoformat()}
-                for task_id, task in self.tasks.items()
-            },
-            'user_stats': self.user_stats
-        }
-        with open(self.file_path, 'w') as f:
-            json.dump(data_to_save, f, indent=2)
+        # Full rewrite of the store; individual mutations only append to the journal
+        with self.lock:
+            self.store.compact()
 
     def clean_old_tasks(self):
-        today = date.today()
-        self.tasks = {
-            task_id: task for task_id, task in self.tasks.items()
-            if task['date'] == today
-        }
-        self.save_data()
+        with self.lock:
+            today = today_ordinal()
+            old_days = sorted(day for day in self.tasks_by_date if day != today)
+            # Archive every day before dropping any; if that fails, nothing is dropped
+            # and the next clean tries again (archiving a day twice is harmless)
+            try:
+                for day in old_days:
+                    tasks = [(task_id, self.tasks[task_id]) for task_id in self.tasks_by_date[day]]
+                    self.archive.archive_day(day, tasks)
+            except OSError as e:
+                print(f"Error archiving old tasks: {e}")
+                return
+            removed_ids = []
+            for day in old_days:
+                for task_id in list(self.tasks_by_date[day]):
+                    self.unindex_task(task_id, self.tasks.pop(task_id))
+                    removed_ids.append(task_id)
+            self.store.record('clean', date=iso_from_ordinal(today))
+            if removed_ids:
+                self.changed('tasks_removed', {'ids': removed_ids})
+            # Once a day is a good moment to fold the journal into the snapshot
+            self.save_data()
 
     def add_task(self, description, user):
-        task_id = str(uuid.uuid4())[:8]  # Generate a unique ID
-        self.tasks[task_id] = {
-            "description": description,
-            "completed": False,
-            "user": user,
-            "date": date.today()
-        }
-        self.save_data()
-        return task_id
+        with self.lock:
+            task_id = str(uuid.uuid4())[:8]  # Generate a unique ID
+            task = Task(description, user, today_ordinal())
+            self.tasks[task_id] = task
+            self.index_task(task_id, task)
+            task_json = task.to_json()
+            self.store.record('add', id=task_id, task=task_json)
+            self.changed('task_added', {'id': task_id, 'task': task_json})
+            return task_id
 
     def remove_task(self, task_id, user):
-        if task_id in self.tasks and self.tasks[task_id]["user"] == user:
-            del self.tasks[task_id]
-            self.save_data()
-            return True
-        return False
+        with self.lock:
+            if task_id in self.tasks and self.tasks[task_id].user == user:
+                self.unindex_task(task_id, self.tasks.pop(task_id))
+                self.store.record('remove', id=task_id)
+                self.changed('tasks_removed', {'ids': [task_id]})
+                return True
+            return False
 
     def complete_task(self, task_id, user):
-        if task_id in self.tasks and self.tasks[task_id]["user"] == user and not self.tasks[task_id]["completed"]:
-            self.tasks[task_id]["completed"] = True
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is not None and task.user == user and not task.completed:
+                task.completed = True
+                discard_from_index(self.open_tasks_by_user, user, task_id)
+                self.open_task_ids.pop(task_id, None)
             
-            # Update user stats
-            if user not in self.user_stats:
-                self.user_stats[user] = {"daily": 0, "total": 0}
-            self.user_stats[user]["daily"] += 1
-            self.user_stats[user]["total"] += 1
+                # Update user stats
+                if user not in self.user_stats:
+                    self.user_stats[user] = {"daily": 0, "total": 0}
+                self.user_stats[user]["daily"] += 1
+                self.user_stats[user]["total"] += 1
+                self.completed_today += 1
+                self.completed_total += 1
+                self.leaderboard.completed(user)
             
-            self.save_data()
-            return True
-        return False
+                self.store.record('complete', id=task_id, user=user)
+                self.changed('task_updated', {'id': task_id, 'task': task.to_json()})
+                return True
+            return False
 
     def get_user_tasks(self, user):
-        today = date.today()
-        return {
-            task_id: task for task_id, task in self.tasks.items()
-            if task["user"] == user and task["date"] == today and not task["completed"]
-        }
+        with self.lock:
+            today = today_ordinal()
+            return {
+                task_id: self.tasks[task_id] for task_id in self.open_tasks_by_user.get(user, ())
+                if self.tasks[task_id].day == today
+            }
+
+    def get_open_tasks(self):
+        with self.lock:
+            today = today_ordinal()
+            return {
+                task_id: self.tasks[task_id] for task_id in self.open_task_ids
+                if self.tasks[task_id].day == today
+            }
+
+    def overlay_snapshot(self):
+        # Everything an overlay needs on connect: timer state and today's tasks
+        return {'timer': self.timer_snapshot(), **self.overlay_view()}
+
+    def overlay_view(self):
+        # Trimmed payload for the overlay: only today's tasks, no user_stats
+        with self.lock:
+            today = today_ordinal()
+            return {
+                'tasks': {task_id: self.tasks[task_id].to_json() for task_id in self.tasks_by_date.get(today, ())},
+            }
 
     def get_user_stats(self, user):
         return self.user_stats.get(user, {"daily": 0, "total": 0})
 
+    def completed_today_by_user(self):
+        # Today's tasks aren't archived yet, so history queries add them on top
+        with self.lock:
+            scores = {}
+            for task_id in self.tasks_by_date.get(today_ordinal(), ()):
+                task = self.tasks[task_id]
+                if task.completed:
+                    scores[task.user] = scores.get(task.user, 0) + 1
+            return scores
+
+    def history_leaderboard(self, period='week', limit=10):
+        today = today_ordinal()
+        if period == 'all':
+            scores = self.archive.completed_all_time()
+        else:
+            scores = self.archive.completed_between(period_start(period, today), today - 1)
+        for user, completed in self.completed_today_by_user().items():
+            scores[user] = scores.get(user, 0) + completed
+        return top(scores, limit)
+
+    def get_user_history(self, user):
+        today = today_ordinal()
+        completed_today = self.completed_today_by_user().get(user, 0)
+        history = self.archive.user_summary(user)
+        history['completed'] += completed_today
+        with self.lock:
+            history['added'] += sum(1 for task_id in self.tasks_by_user.get(user, ())
+                                    if self.tasks[task_id].day == today)
+        if completed_today:
+            history['active_days'] += 1
+            history['first_day'] = history['first_day'] or iso_from_ordinal(today)
+            history['last_day'] = iso_from_ordinal(today)
+        for period in ('week', 'month'):
+            archived = self.archive.completed_between(period_start(period, today), today - 1).get(user, 0)
+            history[period] = archived + completed_today
+        history['streak'], history['best_streak'] = self.archive.streaks(user, today, completed_today > 0)
+        return history
+
     def display_tasks(self):
         while True:
-            self.console.clear()
-            layout = Layout()
-            
-            layout.split_column(
-                Layout(name="top_padding", size=1),
-                Layout(name="main_content")
-            )
-            
-            layout["main_content"].split_column(
-                Layout(name="header", size=14),
-                Layout(name="body"),
-                Layout(name="footer", size=7)
-            )
-            layout["main_content"]["body"].split_row(
-                Layout(name="stats", ratio=3),
-                Layout(name="tasks", ratio=7)
-            )
-
-            # Top padding (empty)
-            layout["top_padding"].update("")
-
-            # Header
-            timer_status = self.get_timer_status()
-            layout["main_content"]["header"].update(Panel(
-                timer_status,
-                title="🍅 Pomodoro 🍅",
-                border_style="bold",
-                padding=(0, 1),
-                expand=True,
-                title_align="center"
-            ))
-
-            # Stats
-            stats_table = Table(show_header=True, header_style="bold magenta", show_lines=False, box=None, padding=(0, 1))
-            stats_table.add_column("User", style="dim", width=22)  # Increased width
-            stats_table.add_column("Today", justify="right", width=12)  # Increased width
-            stats_table.add_column("All-time", justify="right", width=12)  # Increased width
-
-            daily_stats = {user: stats['daily'] for user, stats in self.user_stats.items() if stats['daily'] > 0}
-            total_stats = {user: stats['total'] for user, stats in self.user_stats.items() if stats['total'] > 0}
-
-            for user in set(daily_stats.keys()) | set(total_stats.keys()):
-                stats_table.add_row(user, str(daily_stats.get(user, 0)), str(total_stats.get(user, 0)))
-
-            total_completed = sum(stats['total'] for stats in self.user_stats.values())
-            stats_panel = Panel(
-                stats_table,
-                title="Tasks Completed",  # Changed from "User Stats" to "Tasks Completed"
-                subtitle=f"Total tasks completed (All-time): {total_completed}",
-                border_style="bold green"
-            )
-            layout["main_content"]["body"]["stats"].update(stats_panel)
-
-            # Tasks
-            tasks_table = Table(show_header=True, header_style="bold cyan", show_lines=False, box=None, padding=(0, 1))
-            tasks_table.add_column("ID", style="bright_yellow", width=10)
-            tasks_table.add_column("Description", style="bright_white", width=60, no_wrap=True)
-            tasks_table.add_column("User", style="bright_blue", width=20)
-
-            today = date.today()
-            for task_id, task in self.tasks.items():
-                if task["date"] == today and not task["completed"]:
-                    # Truncate description if it's too long
-                    description = task['description'][:57] + "..." if len(task['description']) > 60 else task['description']
-                    tasks_table.add_row(
-                        task_id,
-                        description,
-                        task['user']
-                    )
-
-            tasks_panel = Panel(
-                tasks_table,
-                title="Today's Open Tasks",  # Changed from "Today's Incomplete Tasks" to "Today's Open Tasks"
-                border_style="bold cyan",
-                title_align="center"
-            )
-            layout["main_content"]["body"]["tasks"].update(tasks_panel)
-
-            # Footer
-            footer_lines = [
-                " Keep up the great work! ",
-                "",  # This adds a blank line
-                "📝 Use !task command to manage your tasks 📝"
-            ]
-            footer_text = Text("\n".join(footer_lines), justify="center")
-            footer_text.stylize("bold green", 0, len(footer_lines[0]))
-            footer_text.stylize("italic cyan", len(footer_lines[0]) + len(footer_lines[1]) + 2, len(footer_text))
-            
-            # Add padding to move text down and center it horizontally
-            # Changed top padding from 2 to 1 to move text up one line
-            padded_footer = Align.center(
-                Padding(footer_text, (1, 0, 0, 0)),  # 1 line padding at the top (changed from 2)
-                vertical="middle"
-            )
-            
-            layout["main_content"]["footer"].update(Panel(
-                padded_footer,
-                border_style="bold",
-                expand=True
-            ))
-
-            self.console.print(layout)
+            self.render_dashboard()
             time.sleep(1)  # Update every second
 
+    def render_dashboard(self):
+        # One dashboard frame; only regions whose data changed are rebuilt
+        if self.dashboard is None:
+            from rich.console import Console
+            from dashboard import Dashboard
+            self.console = Console()
+            self.dashboard = Dashboard(self, self.console)
+        self.dashboard.tick()
+
     def format_task_list(self, tasks):
         if not tasks:
             return "No incomplete tasks for today."
         
         formatted_tasks = []
         for task_id, task in tasks.items():
-            formatted_task = f"{task_id}: {task['description']}"
+            formatted_task = f"{task_id}: {task.description}"
             formatted_tasks.append(formatted_task)
         
         return " || ".join(formatted_tasks)
 
     def reset_daily_stats(self):
-        for user in self.user_stats:
-            self.user_stats[user]["daily"] = 0
+        with self.lock:
+            for user in self.user_stats:
+                self.user_stats[user]["daily"] = 0
+            self.completed_today = 0
+            self.leaderboard.reset_daily()
+            self.changed()
+            self.store.record('reset_daily')
         self.total_completed_pomodoros = 0  # Reset total completed pomodoros
         self.last_pomodoro_date = date.today()  # Reset the last pomodoro date
-        self.save_data()
+        self.checkpoint_timer()
 
     def center_text(self, text, width):
         return text.center(width)
 
     def wipe_user_tasks(self, user):
-        wiped_count = 0
-        tasks_to_remove = []
-        for task_id, task in self.tasks.items():
-            if task["user"] == user:
-                tasks_to_remove.append(task_id)
-                wiped_count += 1
+        with self.lock:
+            tasks_to_remove = list(self.tasks_by_user.get(user, ()))
+            for task_id in tasks_to_remove:
+                self.unindex_task(task_id, self.tasks.pop(task_id))
         
-        for task_id in tasks_to_remove:
-            del self.tasks[task_id]
-        
-        self.save_data()
-        return wiped_count
+            self.store.record('wipe', user=user)
+            if tasks_to_remove:
+                self.changed('tasks_removed', {'ids': tasks_to_remove})
+            return len(tasks_to_remove)
 
     def start_timer(self):
-        self.timer_start = datetime.now()
-        if self.current_phase == 'focus':
-            duration = self.focus_duration
-        elif self.current_phase == 'short_break':
-            duration = self.short_break_duration
-        else:  # long_break
-            duration = self.long_break_duration
-        self.timer_end = self.timer_start + timedelta(minutes=duration)
-        self.timer_paused = False
+        with self.timer_lock:
+            seconds = self.get_duration() * 60
+            self.timer_active = True
+            self.timer_paused = False
+            self.timer_deadline = time.monotonic() + seconds
+            self.paused_remaining = 0.0
+            self.arm_phase_timer(seconds)
+            self.checkpoint_timer()
+            self.changed('timer', self.timer_snapshot())
 
     def stop_timer(self):
-        self.timer_start = None
-        self.timer_end = None
-        self.timer_type = None
-        self.timer_paused = False
-        self.timer_pause_start = None
-        self.current_phase = 'focus'
-        self.pomodoro_count = 0
+        with self.timer_lock:
+            self.cancel_phase_timer()
+            self.timer_active = False
+            self.timer_paused = False
+            self.timer_deadline = None
+            self.paused_remaining = 0.0
+            self.current_phase = 'focus'
+            self.pomodoro_count = 0
+            self.checkpoint_timer()
+            self.changed('timer', self.timer_snapshot())
+
+    def arm_phase_timer(self, seconds):
+        self.cancel_phase_timer()
+        self.phase_generation += 1
+        self.phase_timer = self.scheduler.schedule(seconds, partial(self.on_phase_deadline, self.phase_generation))
+
+    def cancel_phase_timer(self):
+        if self.phase_timer is not None:
+            self.phase_timer.cancel()
+            self.phase_timer = None
+
+    def on_phase_deadline(self, generation):
+        with self.timer_lock:
+            # A stop, pause or restart that raced with the deadline wins
+            if generation != self.phase_generation or not self.timer_active or self.timer_paused:
+                return
+            self.phase_timer = None
+            self.next_phase()
+
+    def remaining_seconds(self):
+        if not self.timer_active:
+            return 0
+        if self.timer_paused:
+            remaining = self.paused_remaining
+        else:
+            remaining = self.timer_deadline - time.monotonic()
+        return max(0, int(remaining))
+
+    def checkpoint_timer(self):
+        # Written on every transition (start, stop, pause, resume, phase change,
+        # daily reset), never per tick. Wall-clock saved_at is only used to
+        # account for downtime, which monotonic time can't span.
+        if not self.timer_active:
+            state, remaining = 'stopped', 0.0
+        elif self.timer_paused:
+            state, remaining = 'paused', self.paused_remaining
+        else:
+            state, remaining = 'running', max(0.0, self.timer_deadline - time.monotonic())
+        try:
+            atomic_write_json(self.timer_state_path, {
+                'state': state,
+                'phase': self.current_phase,
+                'remaining': remaining,
+                'saved_at': time.time(),
+                'pomodoro_count': self.pomodoro_count,
+                'total_completed': self.total_completed_pomodoros,
+                'last_pomodoro_date': self.last_pomodoro_date.isoformat(),
+            })
+        except OSError as e:
+            print(f"Error saving timer state: {e}")
+
+    def restore_timer_state(self):
+        try:
+            with open(self.timer_state_path, 'r') as f:
+                saved = json.load(f)
+            state = saved['state']
+            remaining = float(saved['remaining'])
+            self.current_phase = saved['phase']
+            self.pomodoro_count = saved['pomodoro_count']
+            self.total_completed_pomodoros = saved['total_completed']
+            self.last_pomodoro_date = date.fromisoformat(saved['last_pomodoro_date'])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading timer state: {e}")
+            return
+
+        if state == 'paused':
+            self.timer_active = True
+            self.timer_paused = True
+            self.paused_remaining = remaining
+        elif state == 'running':
+            # The phase kept running while the bot was down; if it ended
+            # meanwhile, the deadline fires right away and moves to the next one
+            remaining = max(0.0, remaining - max(0.0, time.time() - saved['saved_at']))
+            # Armed by attach_scheduler, once the engine has installed its scheduler
+            self.timer_active = True
+            self.timer_deadline = time.monotonic() + remaining
+
+    def attach_scheduler(self, scheduler=None):
+        # Called by each engine before it starts serving: switches to its scheduler
+        # (the asyncio bot's runs on the loop) and arms a phase restored as running
+        with self.timer_lock:
+            if scheduler is not None:
+                self.scheduler = scheduler
+            if self.timer_active and not self.timer_paused and self.phase_timer is None:
+                self.arm_phase_timer(max(0.0, self.timer_deadline - time.monotonic()))
+
+    def timer_snapshot(self):
+        if not self.timer_active:
+            return {
+                "remaining_seconds": 0,
+                "phase": "",
+                "pomodoro_count": self.pomodoro_count,
+                "max_pomodoros": self.max_pomodoros,
+                "total_completed": self.total_completed_pomodoros,
+                "paused": False
+            }
+
+        return {
+            "remaining_seconds": self.remaining_seconds(),
+            "phase": self.current_phase,
+            "pomodoro_count": self.pomodoro_count,
+            "max_pomodoros": self.max_pomodoros,
+            "total_completed": self.total_completed_pomodoros,
+            "paused": self.timer_paused
+        }
 
     def get_timer_status(self):
+        # Only the console dashboard draws this, so rich is imported here rather than at startup
+        from rich.align import Align
+        from rich.console import Group
+        from rich.padding import Padding
+        from rich.text import Text
+
         self.check_and_reset_pomodoros()
         
         status_lines = []
         
         # Add the current phase text with padding
-        if not self.timer_start:
+        if not self.timer_active:
             phase_text = "No active timer"
         else:
             phase_text = {
@@ -332,22 +492,13 @@ class TaskManager:
         phase_text_with_padding = Padding(Text(f"⏳ {phase_text}", style="bold cyan"), (1, 0, 1, 0))
         status_lines.append(phase_text_with_padding)
         
-        if self.timer_start:
-            if self.timer_paused:
-                remaining = self.timer_end - self.timer_pause_start
-            else:
-                remaining = self.timer_end - datetime.now()
-            
-            if remaining.total_seconds() <= 0:
-                self.next_phase()
-                status_lines.append(Text(f"🔄 {self.current_phase.capitalize()} time started!", style="bold"))
-                status_lines.append(Text(f"⏱️ Duration: {self.get_duration()} minutes", style="bold"))
-            else:
-                minutes, seconds = divmod(int(remaining.total_seconds()), 60)
-                timer_display = f"{minutes:02d}:{seconds:02d}"
-                big_timer = create_big_text(timer_display)
-                timer_color = "bold green" if self.current_phase == 'focus' else "bold yellow"
-                status_lines.append(Text(big_timer, style=timer_color))
+        if self.timer_active:
+            # The scheduler advances the phase at the deadline; until it fires, show 00:00
+            minutes, seconds = divmod(self.remaining_seconds(), 60)
+            timer_display = f"{minutes:02d}:{seconds:02d}"
+            big_timer = self.big_font.render(timer_display)
+            timer_color = "bold green" if self.current_phase == 'focus' else "bold yellow"
+            status_lines.append(Text(big_timer, style=timer_color))
         
         completion_text = f"🏆 Completed: {self.total_completed_pomodoros} | 🔄 Cycle: {self.pomodoro_count + 1}/{self.max_pomodoros}"
         completion_text_with_padding = Padding(Text(completion_text, style="bold"), (1, 0, 1, 0))
@@ -362,6 +513,8 @@ class TaskManager:
         if today > self.last_pomodoro_date:
             self.total_completed_pomodoros = 0
             self.last_pomodoro_date = today
+            self.checkpoint_timer()
+            self.changed()
 
     def next_phase(self):
         if self.current_phase == 'focus':
@@ -376,7 +529,7 @@ class TaskManager:
         else:  # It's a break phase
             self.current_phase = 'focus'
         
-        self.complete_sound.play()
+        self.play_sound()
         self.start_timer()
 
         if self.phase_change_callback:
@@ -407,9 +560,12 @@ class TaskManager:
         with open(self.config_file, 'w') as configfile:
             self.config.write(configfile)
 
+    def play_sound(self):
+        # Queued; never waits on the audio device. Uses the volume as of now, no reload needed.
+        self.audio.play(self.sound_sink, self.current_phase, self.volume)
+
     def set_volume(self, volume):
         self.volume = max(0.0, min(1.0, volume))  # Ensure volume is between 0 and 1
-        self.complete_sound.set_volume(self.volume)
         
         # Update config with new volume (store as percentage)
         volume_percentage = int(self.volume * 100)
@@ -453,94 +609,28 @@ class TaskManager:
         return username.lower() in self.blocked_users
 
     def pause_timer(self):
-        if self.timer_start and not self.timer_paused:
-            self.timer_paused = True
-            self.timer_pause_start = datetime.now()
+        with self.timer_lock:
+            if self.timer_active and not self.timer_paused:
+                self.cancel_phase_timer()
+                self.timer_paused = True
+                self.paused_remaining = max(0.0, self.timer_deadline - time.monotonic())
+                self.timer_deadline = None
+                self.checkpoint_timer()
+                self.changed('timer', self.timer_snapshot())
 
     def resume_timer(self):
-        if self.timer_paused:
-            pause_duration = datetime.now() - self.timer_pause_start
-            self.timer_end += pause_duration
-            self.timer_paused = False
-            self.timer_pause_start = None
-
-def get_big_digits():
-    return [
-        # 0
-        ["█████",
-         "█   █",
-         "█   █",
-         "█   █",
-         "█████"],
-        # 1
-        ["  █  ",
-         "  █  ",
-         "  █  ",
-         "  █  ",
-         "  █  "],
-        # 2
-        ["█████",
-         "    █",
-         "█████",
-         "█    ",
-         "█████"],
-        # 3
-        ["█████",
-         "    █",
-         "█████",
-         "    █",
-         "█████"],
-        # 4
-        ["█   █",
-         "█   █",
-         "█████",
-         "    █",
-         "    █"],
-        # 5
-        ["█████",
-         "█    ",
-         "█████",
-         "    █",
-         "█████"],
-        # 6
-        ["█████",
-         "█    ",
-         "█████",
-         "█   █",
-         "█████"],
-        # 7
-        ["█████",
-         "    █",
-         "    █",
-         "    █",
-         "    █"],
-        # 8
-        ["█████",
-         "█   █",
-         "█████",
-         "█   █",
-         "█████"],
-        # 9
-        ["█████",
-         "█   █",
-         "█████",
-         "    █",
-         "█████"]
-    ]
-
-def create_big_text(text):
-    big_digits = get_big_digits()
-    lines = [""] * 5  # Changed from 6 to 5 lines
-    for char in text:
-        if char.isdigit():
-            digit = big_digits[int(char)]
-            for i, line in enumerate(digit):
-                lines[i] += line + "  "  # Add two spaces between digits
-        elif char == ":":
-            for i in range(5):  # Changed from 6 to 5
-                if i in (1, 3):  # Changed from (1, 4) to (1, 3)
-                    lines[i] += "██  "
-                else:
-                    lines[i] += "    "
-    return "\n".join(lines)
-
+        with self.timer_lock:
+            if self.timer_paused:
+                self.timer_paused = False
+                self.timer_deadline = time.monotonic() + self.paused_remaining
+                self.arm_phase_timer(self.paused_remaining)
+                self.paused_remaining = 0.0
+                self.checkpoint_timer()
+                self.changed('timer', self.timer_snapshot())
+
+def discard_from_index(index, key, task_id):
+    entries = index.get(key)
+    if entries is not None:
+        entries.pop(task_id, None)
+        if not entries:
+            del index[key]
@@ -0,0 +1,52 @@
+import sys
+from datetime import date
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def ordinal_from_iso(iso_date):
+    # Cached so every task from the same day shares one int object
+    return date.fromisoformat(iso_date).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def iso_from_ordinal(day):
+    return date.fromordinal(day).isoformat()
+
+
+def today_ordinal():
+    return ordinal_from_iso(date.today().isoformat())
+
+
+class Task:
+    """
+    One chat task. Slotted to keep per-task memory small when tens of
+    thousands are retained; the date is stored as a date ordinal and the
+    username is interned, so repeated values are shared, not copied.
+    """
+    __slots__ = ('description', 'completed', 'user', 'day')
+
+    def __init__(self, description, user, day, completed=False):
+        self.description = description
+        self.completed = completed
+        self.user = sys.intern(user)
+        self.day = day
+
+    @property
+    def date(self):
+        return date.fromordinal(self.day)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['description'], data['user'], ordinal_from_iso(data['date']), data['completed'])
+
+    def to_json(self):
+        return {
+            "description": self.description,
+            "completed": self.completed,
+            "user": self.user,
+            "date": iso_from_ordinal(self.day),
+        }
+
+    def __repr__(self):
+        return f"Task({self.description!r}, {self.user!r}, {iso_from_ordinal(self.day)!r}, completed={self.completed})"
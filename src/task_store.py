@@ -0,0 +1,302 @@
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+
+from metrics import SIZE_BUCKETS, registry
+
+# Compact the journal into a fresh snapshot after this many entries...
+COMPACT_EVERY_ENTRIES = 500
+# ...or when the oldest uncompacted entry is older than this many seconds
+COMPACT_INTERVAL = 300
+
+# Observed by the stores themselves, so automatic compactions count as much as save_data
+SAVE_SECONDS = registry.histogram('twitchbot_save_data_seconds',
+                                  "Time to rewrite the task store, from save_data or automatic compaction")
+SAVE_BYTES = registry.histogram('twitchbot_save_data_bytes', "Bytes written per task store rewrite (JSON storage only)",
+                                buckets=SIZE_BUCKETS)
+RECORD_SECONDS = registry.histogram('twitchbot_store_record_seconds', "Time to persist one task mutation",
+                                    label='op')
+
+# Read once at import, while nothing else is creating files: os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def file_mode(path):
+    # The target's current permissions, or what a plain open(path, 'w') would give a new file
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
+def atomic_write_json(path, data):
+    # Write to a temp file in the same directory, then rename over the target,
+    # so readers and crashes only ever see the old or the new file. Returns the size written.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+            size = os.fstat(f.fileno()).st_size
+        # mkstemp creates the file 0600; keep the permissions the target had (or would get)
+        os.chmod(temp_path, file_mode(path))
+        os.replace(temp_path, path)
+        return size
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def apply_entry(tasks, user_stats, entry):
+    # Replays one journal entry onto the serialized (date-as-string) task dicts
+    op = entry['op']
+    if op == 'add':
+        tasks[entry['id']] = entry['task']
+    elif op == 'remove':
+        tasks.pop(entry['id'], None)
+    elif op == 'complete':
+        task = tasks.get(entry['id'])
+        if task is not None:
+            task['completed'] = True
+        stats = user_stats.setdefault(entry['user'], {"daily": 0, "total": 0})
+        stats['daily'] += 1
+        stats['total'] += 1
+    elif op == 'wipe':
+        for task_id in [task_id for task_id, task in tasks.items() if task['user'] == entry['user']]:
+            del tasks[task_id]
+    elif op == 'clean':
+        for task_id in [task_id for task_id, task in tasks.items() if task['date'] != entry['date']]:
+            del tasks[task_id]
+    elif op == 'reset_daily':
+        for stats in user_stats.values():
+            stats['daily'] = 0
+
+
+class JournalStore:
+    """
+    Write-behind persistence for TaskManager.
+
+    Every mutation is appended as one JSON line to `<file_path>.journal`.
+    The full state is only rewritten (atomically) into `file_path` when the
+    journal is compacted, which happens every COMPACT_EVERY_ENTRIES entries
+    or COMPACT_INTERVAL seconds. Loading replays the snapshot plus the journal.
+    """
+
+    def __init__(self, file_path, snapshot_fn=None,
+                 compact_every=COMPACT_EVERY_ENTRIES, compact_interval=COMPACT_INTERVAL):
+        self.file_path = file_path
+        self.journal_path = file_path + '.journal'
+        self.snapshot_fn = snapshot_fn
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self.lock = threading.RLock()
+        self.journal = None
+        self.seq = 0  # sequence number of the last journal entry written
+        self.pending_entries = 0
+        self.first_pending_at = None
+
+    def load(self):
+        tasks, user_stats = {}, {}
+        snapshot_seq = 0
+        if os.path.exists(self.file_path):
+            with open(self.file_path, 'r') as f:
+                data = json.load(f)
+            tasks = data.get('tasks', {})
+            user_stats = data.get('user_stats', {})
+            snapshot_seq = data.get('journal_seq', 0)
+        self.seq = snapshot_seq
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                raw = f.read()
+            good_length = 0
+            for line in raw.splitlines(keepends=True):
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated entry")
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash mid-append leaves at most one torn line at the end
+                    print(f"Ignoring truncated entry at end of {self.journal_path}")
+                    break
+                good_length += len(line)
+                # Entries already folded into the snapshot are skipped, in case
+                # we crashed between writing the snapshot and truncating the journal
+                if entry['seq'] <= snapshot_seq:
+                    continue
+                apply_entry(tasks, user_stats, entry)
+                self.seq = entry['seq']
+                self.pending_entries += 1
+            if good_length < len(raw):
+                # Cut the torn tail off so new entries start on a clean line
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(good_length)
+            if self.pending_entries:
+                self.first_pending_at = time.monotonic()
+        return tasks, user_stats
+
+    def record(self, op, **fields):
+        with self.lock:
+            start = time.perf_counter()
+            if self.journal is None:
+                self.journal = open(self.journal_path, 'a')
+            self.seq += 1
+            entry = {'seq': self.seq, 'op': op, **fields}
+            self.journal.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self.journal.flush()
+            RECORD_SECONDS.observe(time.perf_counter() - start, op)
+            self.pending_entries += 1
+            if self.first_pending_at is None:
+                self.first_pending_at = time.monotonic()
+            due = (self.pending_entries >= self.compact_every
+                   or time.monotonic() - self.first_pending_at >= self.compact_interval)
+            if due and self.snapshot_fn:
+                self.compact()
+
+    def compact(self, data=None):
+        with self.lock:
+            start = time.perf_counter()
+            if data is None:
+                data = self.snapshot_fn()
+            size = atomic_write_json(self.file_path, {**data, 'journal_seq': self.seq})
+            if self.journal is not None:
+                self.journal.close()
+            self.journal = open(self.journal_path, 'w')
+            self.pending_entries = 0
+            self.first_pending_at = None
+            SAVE_SECONDS.observe(time.perf_counter() - start)
+            SAVE_BYTES.observe(size)
+            return size
+
+    def close(self):
+        with self.lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+
+
+class SqliteStore:
+    """
+    SQLite persistence for TaskManager, in WAL mode.
+
+    Each journal-style mutation becomes one indexed statement, so wiping a
+    user or dropping old days never touches unrelated rows. Same interface
+    as JournalStore; compaction is left to SQLite's own checkpointing.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            description TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            user TEXT NOT NULL,
+            date TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_user_date_completed ON tasks (user, date, completed);
+        CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks (date);
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user TEXT PRIMARY KEY,
+            daily INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0
+        );
+    """
+
+    def __init__(self, file_path, snapshot_fn=None):
+        self.file_path = file_path
+        self.snapshot_fn = snapshot_fn
+        self.lock = threading.RLock()
+        # Mutations come from the IRC thread and the maintenance thread
+        self.db = sqlite3.connect(file_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def load(self):
+        with self.lock:
+            tasks = {
+                task_id: {"description": description, "completed": bool(completed), "user": user, "date": day}
+                for task_id, description, completed, user, day
+                in self.db.execute("SELECT id, description, completed, user, date FROM tasks")
+            }
+            user_stats = {
+                user: {"daily": daily, "total": total}
+                for user, daily, total in self.db.execute("SELECT user, daily, total FROM user_stats")
+            }
+        return tasks, user_stats
+
+    def record(self, op, **fields):
+        start = time.perf_counter()
+        with self.lock, self.db:
+            if op == 'add':
+                task = fields['task']
+                self.db.execute(
+                    "INSERT OR REPLACE INTO tasks (id, description, completed, user, date) VALUES (?, ?, ?, ?, ?)",
+                    (fields['id'], task['description'], int(task['completed']), task['user'], task['date'])
+                )
+            elif op == 'remove':
+                self.db.execute("DELETE FROM tasks WHERE id = ?", (fields['id'],))
+            elif op == 'complete':
+                self.db.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (fields['id'],))
+                self.db.execute(
+                    "INSERT INTO user_stats (user, daily, total) VALUES (?, 1, 1) "
+                    "ON CONFLICT (user) DO UPDATE SET daily = daily + 1, total = total + 1",
+                    (fields['user'],)
+                )
+            elif op == 'wipe':
+                self.db.execute("DELETE FROM tasks WHERE user = ?", (fields['user'],))
+            elif op == 'clean':
+                self.db.execute("DELETE FROM tasks WHERE date != ?", (fields['date'],))
+            elif op == 'reset_daily':
+                self.db.execute("UPDATE user_stats SET daily = 0 WHERE daily != 0")
+        # Includes the commit, which is where SQLite does the writing
+        RECORD_SECONDS.observe(time.perf_counter() - start, op)
+
+    def compact(self, data=None):
+        # Every mutation is already durable; just fold the WAL back into the main file
+        with self.lock:
+            start = time.perf_counter()
+            self.db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            SAVE_SECONDS.observe(time.perf_counter() - start)
+
+    def import_data(self, tasks, user_stats):
+        # Bulk load of serialized (date-as-string) tasks, used by the JSON migration
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO tasks (id, description, completed, user, date) VALUES (?, ?, ?, ?, ?)",
+                [(task_id, task['description'], int(task['completed']), task['user'], task['date'])
+                 for task_id, task in tasks.items()]
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO user_stats (user, daily, total) VALUES (?, ?, ?)",
+                [(user, stats.get('daily', 0), stats.get('total', 0)) for user, stats in user_stats.items()]
+            )
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+STORAGE_BACKENDS = {
+    'json': JournalStore,
+    'sqlite': SqliteStore,
+}
+
+
+def open_store(file_path, backend='json', snapshot_fn=None):
+    """
+    Create the storage backend for TaskManager. For 'sqlite' a '.json'
+    file name is swapped for '.db', so both can sit side by side.
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    if backend == 'sqlite' and file_path.endswith('.json'):
+        file_path = file_path[:-len('.json')] + '.db'
+    return STORAGE_BACKENDS[backend](file_path, snapshot_fn)
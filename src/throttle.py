@@ -0,0 +1,68 @@
+import time
+from collections import OrderedDict
+
+from send_queue import TokenBucket
+
+# Every viewer gets a bucket of this many commands, refilled over USER_PERIOD seconds
+USER_BURST = 5
+USER_PERIOD = 30
+# Minimum seconds between two uses of the same command by the same viewer
+DEFAULT_COOLDOWN = 2
+# Viewers tracked at once; the least recently active are forgotten first
+MAX_TRACKED_USERS = 10000
+
+
+class UserThrottle:
+    __slots__ = ('bucket', 'last_used')
+
+    def __init__(self, burst, period):
+        self.bucket = TokenBucket(burst, period)
+        self.last_used = {}  # command name -> monotonic time of last accepted use
+
+
+class CommandThrottle:
+    """
+    Per-viewer token bucket plus per-viewer, per-command cooldowns, checked
+    by the command router before a command runs. State lives in an LRU
+    bounded by max_users, so a raid of one-off chatters can't grow it
+    without limit; forgetting a quiet viewer only resets their limits.
+    """
+
+    def __init__(self, burst=USER_BURST, period=USER_PERIOD, max_users=MAX_TRACKED_USERS):
+        self.burst = burst
+        self.period = period
+        self.max_users = max_users
+        self.users = OrderedDict()
+        self.suppressed = 0
+        self.suppressed_by_command = {}
+
+    def allow(self, username, command, cooldown=DEFAULT_COOLDOWN, now=None):
+        now = time.monotonic() if now is None else now
+        key = username.lower()
+        state = self.users.get(key)
+        if state is None:
+            state = self.users[key] = UserThrottle(self.burst, self.period)
+            if len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(key)
+
+        last = state.last_used.get(command)
+        if last is not None and now - last < cooldown:
+            return self.suppress(command)
+        if not state.bucket.try_take(now):
+            return self.suppress(command)
+        state.last_used[command] = now
+        return True
+
+    def suppress(self, command):
+        self.suppressed += 1
+        self.suppressed_by_command[command] = self.suppressed_by_command.get(command, 0) + 1
+        return False
+
+    def stats(self):
+        return {
+            "suppressed": self.suppressed,
+            "suppressed_by_command": dict(self.suppressed_by_command),
+            "tracked_users": len(self.users),
+        }
@@ -0,0 +1,82 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class ScheduledCall:
+    __slots__ = ('deadline', 'callback', 'cancelled')
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """
+    Fires callbacks at time.monotonic() deadlines from one daemon thread.
+
+    Pending calls sit in a heap, and the thread sleeps exactly until the
+    earliest one, so any number of timers (one per channel) share a single
+    thread. Wall-clock jumps (NTP, DST) don't move deadlines.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.cond = threading.Condition()
+        self.counter = itertools.count()
+        self.thread = None
+
+    def schedule(self, delay, callback):
+        call = ScheduledCall(time.monotonic() + max(0, delay), callback)
+        with self.cond:
+            heapq.heappush(self.heap, (call.deadline, next(self.counter), call))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='timer-scheduler', daemon=True)
+                self.thread.start()
+            self.cond.notify()
+        return call
+
+    def next_due(self):
+        # Called with the lock held; blocks until a live call is due and pops it
+        while True:
+            while self.heap and self.heap[0][2].cancelled:
+                heapq.heappop(self.heap)
+            if not self.heap:
+                self.cond.wait()
+                continue
+            delay = self.heap[0][0] - time.monotonic()
+            if delay <= 0:
+                return heapq.heappop(self.heap)[2]
+            self.cond.wait(delay)
+
+    def run(self):
+        while True:
+            with self.cond:
+                call = self.next_due()
+            # Run outside the lock so callbacks can schedule the next deadline
+            try:
+                call.callback()
+            except Exception as e:
+                print(f"Error in scheduled timer callback: {e}")
+
+
+class AsyncioScheduler:
+    """
+    Same interface as DeadlineScheduler, backed by loop.call_later (which
+    also uses the monotonic clock), so callbacks run on the event loop.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def schedule(self, delay, callback):
+        return self.loop.call_later(max(0, delay), callback)
+
+
+# Shared by every TaskManager in the process unless one is given explicitly
+shared_scheduler = DeadlineScheduler()